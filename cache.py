@@ -0,0 +1,127 @@
+"""
+Caching utilities for DreamHeaven RAG API
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting least recently used entries when full"""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class EmbeddingCache:
+    """Cache of query embeddings keyed by normalized query text"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 24 * 3600.0):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def _key(text: str) -> str:
+        # Queries differing only in case or whitespace share one embedding
+        normalized = " ".join(text.lower().split())
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, if any"""
+        return self._cache.get(self._key(text))
+
+    def store(self, text: str, embedding: List[float]):
+        """Cache the embedding computed for text"""
+        self._cache.set(self._key(text), embedding)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class SemanticResultCache:
+    """Cache of results matched by an exact key plus query-embedding similarity
+
+    Entries sharing a key (e.g. the same extracted intent) are reused for any
+    query whose embedding has cosine similarity >= threshold with a stored one.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_keys: int = 1024,
+        max_entries_per_key: int = 32,
+        ttl_seconds: float = 300.0,
+    ):
+        self.threshold = threshold
+        self.max_entries_per_key = max_entries_per_key
+        self.ttl_seconds = ttl_seconds
+        self._cache = TTLCache(max_entries=max_keys, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get(self, key: Hashable, embedding: List[float]) -> Optional[Any]:
+        """Return the closest cached value for key, if similar enough and not expired"""
+        entries = self._cache.get(key)
+        if not entries:
+            return None
+
+        now = time.monotonic()
+        entries[:] = [entry for entry in entries if now - entry[0] <= self.ttl_seconds]
+        if not entries:
+            return None
+
+        similarities = np.stack([entry[1] for entry in entries]) @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        return entries[best][2]
+
+    def store(self, key: Hashable, embedding: List[float], value: Any):
+        """Cache value for key under the given query embedding"""
+        entries = self._cache.get(key)
+        if entries is None:
+            entries = []
+            self._cache.set(key, entries)
+        entries.append((time.monotonic(), self._normalize(embedding), value))
+        del entries[:-self.max_entries_per_key]
+
+    def clear(self):
+        """Drop all cached entries"""
+        self._cache.clear()
@@ -3,6 +3,7 @@ Configuration module for DreamHeaven RAG API
 """
 
 import os
+import functools
 from typing import Optional
 
 
@@ -14,6 +15,12 @@ class Config:
         self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
         self.PORT = int(os.getenv("PORT", 8001))
         self.HOST = os.getenv("HOST", "0.0.0.0")
+        # Database pool; set DB_STATEMENT_CACHE_SIZE=0 behind a transaction-mode pooler (pgbouncer)
+        self.DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 5))
+        self.DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))
+        self.DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))
+        # Refresh interval for the in-memory embedding matrix (0, the default, disables it)
+        self.EMBEDDING_MATRIX_REFRESH_SECONDS = int(os.getenv("EMBEDDING_MATRIX_REFRESH_SECONDS", 0))
         
         # Validate required environment variables
         if not self.DATABASE_URL or not self.OPENAI_API_KEY:
@@ -34,3 +41,9 @@ class Config:
     @property
     def host(self) -> str:
         return self.HOST
+
+
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Return the shared configuration, reading and validating the environment only once"""
+    return Config()
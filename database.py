@@ -2,38 +2,157 @@
 Database management module for DreamHeaven RAG API
 """
 
+import asyncio
 import logging
 import asyncpg
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
+# HNSW candidate list size for vector searches (pgvector default is 40); the index
+# returns at most this many rows, so it covers the search engine's candidate depth
+HNSW_EF_SEARCH = 200
+
+# pgvector release that added iterative index scans (hnsw.iterative_scan)
+PGVECTOR_ITERATIVE_SCAN_VERSION = (0, 8)
+
+# where_clause of an unfiltered vector search
+UNFILTERED_WHERE_CLAUSE = "embedding IS NOT NULL"
+
+# Columns read by the scoring engine, fetched for every vector search hit
+SCORING_COLUMNS = """
+    id, title, address, bedrooms, bathrooms, square_feet,
+    garage_number, has_parking_lot, property_type,
+    price_for_sale, price_per_month,
+    has_yard, school_rating, crime_index,
+    shopping_idx, grocery_idx,
+    city, state, neighborhood,
+    amenities, is_featured,
+    property_listing_type, year_renovated
+"""
+
+# Remaining display columns, fetched only for the listings actually returned
+DETAIL_COLUMNS = """
+    id, facing, tags, embedding_text, country,
+    description, host_id, is_available,
+    latitude, longitude, rating, review_count,
+    year_built, created_at, updated_at,
+    CASE 
+        WHEN property_listing_type = 'sale' THEN price_for_sale
+        WHEN property_listing_type = 'both' THEN price_per_month
+        WHEN property_listing_type = 'rent' THEN price_per_month
+        ELSE COALESCE(price_per_month, price_for_sale)
+    END as price,
+    images
+"""
+
+
+def _parse_version(version: Optional[str]) -> Tuple[int, ...]:
+    """Numeric components of an extension version string ('0.8.0' -> (0, 8, 0))"""
+    parts = []
+    for part in (version or "").split("."):
+        if not part.isdigit():
+            break
+        parts.append(int(part))
+    return tuple(parts)
+
+
+def _build_embedding_index(
+    known: Dict[Any, Tuple[Any, np.ndarray]],
+    stamps: Sequence[Any],
+    rows: Sequence[Any]
+) -> Tuple[Dict[Any, Tuple[Any, np.ndarray]], Tuple[List[Any], np.ndarray]]:
+    """Merge freshly fetched embeddings into the known ones and stack the current listings
+    
+    Listings missing from stamps (deleted or no longer embedded) are dropped.
+    Returns the new per-listing rows and the (ids, L2-normalized matrix) index.
+    """
+    embedding_rows = {row['id']: known[row['id']] for row in stamps if row['id'] in known}
+    for row in rows:
+        vector = np.asarray(row['embedding'], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        embedding_rows[row['id']] = (row['updated_at'], vector)
+    
+    ids = list(embedding_rows)
+    if not ids:
+        # Nothing embedded yet; full_vector_search returns no candidates
+        return embedding_rows, (ids, np.empty((0, 0), dtype=np.float32))
+    matrix = np.stack([vector for _, vector in embedding_rows.values()])
+    return embedding_rows, (ids, matrix)
+
 
 class DatabaseManager:
     """Manages database connections and operations"""
     
-    def __init__(self, database_url: str):
+    def __init__(
+        self,
+        database_url: str,
+        min_pool_size: int = 5,
+        max_pool_size: int = 20,
+        statement_cache_size: int = 256
+    ):
         self.database_url = database_url
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.statement_cache_size = statement_cache_size
         self.pool: Optional[asyncpg.Pool] = None
+        # Ranking column and its pgvector type; falls back to the fp32 embedding
+        # column until migrations/001_hnsw_embedding_index.sql has been applied
+        self.ranking_column = "embedding_hv"
+        self.ranking_type = "halfvec"
+        # Whether HNSW keeps scanning until filtered searches have enough rows (pgvector 0.8+)
+        self.iterative_scan = False
+        # (listing ids, L2-normalized float32 embedding matrix), swapped as a whole on refresh
+        self.embedding_index: Optional[Tuple[List[Any], np.ndarray]] = None
+        # Listing id -> (updated_at, normalized embedding) behind embedding_index, so
+        # refreshes only fetch listings that changed
+        self._embedding_rows: Dict[Any, Tuple[Any, np.ndarray]] = {}
     
     async def initialize(self):
         """Initialize database connection pool"""
         try:
+            # Check pgvector and the schema first, since they decide the pool's session settings
+            conn = await asyncpg.connect(self.database_url)
+            try:
+                await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                version = await conn.fetchval("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+                logger.info("pgvector extension verified (version %s)", version)
+                
+                has_halfvec = await conn.fetchval(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'listings_v2' AND column_name = 'embedding_hv'"
+                )
+                if not has_halfvec:
+                    self.ranking_column = "embedding"
+                    self.ranking_type = "vector"
+                    logger.warning("listings_v2.embedding_hv missing, ranking on embedding; apply migrations/001_hnsw_embedding_index.sql")
+            finally:
+                await conn.close()
+            
+            server_settings = {'hnsw.ef_search': str(HNSW_EF_SEARCH)}
+            self.iterative_scan = _parse_version(version) >= PGVECTOR_ITERATIVE_SCAN_VERSION
+            if self.iterative_scan:
+                # Filtered HNSW searches keep scanning until LIMIT rows pass the filter,
+                # still returned in exact distance order
+                server_settings['hnsw.iterative_scan'] = 'strict_order'
+            
             self.pool = await asyncpg.create_pool(
                 self.database_url,
-                min_size=2,
-                max_size=10,
-                command_timeout=60
+                min_size=self.min_pool_size,
+                max_size=self.max_pool_size,
+                # Search SQL text is stable per filter shape, so prepared statements are reused
+                statement_cache_size=self.statement_cache_size,
+                command_timeout=60,
+                # Sent at connection startup, so they also survive the pool's RESET ALL
+                server_settings=server_settings
             )
             logger.info("Database connection pool created successfully")
-            
-            # Test the connection and ensure pgvector is available
-            async with self.pool.acquire() as conn:
-                await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
-                logger.info("pgvector extension verified")
                 
         except Exception as e:
-            logger.error(f"Failed to create database pool: {e}")
+            logger.error("Failed to create database pool: %s", e)
             raise
     
     async def close(self):
@@ -62,7 +181,7 @@ class DatabaseManager:
                     "embedding_coverage": f"{(embedded_listings/total_listings*100):.1f}%" if total_listings > 0 else "0%"
                 }
         except Exception as e:
-            logger.error(f"Stats query failed: {e}")
+            logger.error("Stats query failed: %s", e)
             raise
     
     async def get_embedding(self, text: str) -> List[float]:
@@ -71,94 +190,163 @@ class DatabaseManager:
         # as it requires OpenAI client
         raise NotImplementedError("Use SearchEngine.get_embedding() instead")
     
-    async def vector_search(self, embedding: List[float], candidate_ids: List[str], top_k: int = 100) -> List[Dict[str, Any]]:
-        """Perform vector search on filtered candidates or entire database if no candidates provided"""
+    async def vector_search(
+        self,
+        embedding: List[float],
+        where_clause: str = UNFILTERED_WHERE_CLAUSE,
+        params: Sequence[Any] = (),
+        top_k: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Return the top_k listings matching where_clause, ranked by cosine distance in one query
+        
+        where_clause may reference params as $1..$n; the query embedding is bound
+        after them. Ranking uses the half-precision embedding_hv column and its
+        HNSW index (see migrations/001_hnsw_embedding_index.sql).
+        
+        HNSW applies filters after its approximate scan, so without pgvector 0.8's
+        iterative scans a selective filter could leave fewer than top_k rows even
+        when more listings match; filtered searches then rank the matching rows
+        exactly instead.
+        """
         try:
-            if not candidate_ids:
-                logger.info("No candidate IDs provided, performing full database vector search")
-                # Search entire database
-                embedding_str = f"[{','.join(map(str, embedding))}]"
-                
-                query = f"""
-                SELECT 
-                    id, title, address, bedrooms, bathrooms, square_feet,
-                    garage_number, has_parking_lot, property_type,
-                    price_for_sale, price_per_month,
-                    has_yard, school_rating, crime_index, facing,
-                    shopping_idx, grocery_idx, tags, embedding_text,
-                    city, state, country, neighborhood,
-                    description, amenities, host_id, is_available, is_featured,
-                    latitude, longitude, rating, review_count,
-                    property_listing_type, year_built, year_renovated,
-                    created_at, updated_at,
-                    CASE 
-                        WHEN property_listing_type = 'sale' THEN price_for_sale
-                        WHEN property_listing_type = 'both' THEN price_per_month
-                        WHEN property_listing_type = 'rent' THEN price_per_month
-                        ELSE COALESCE(price_per_month, price_for_sale)
-                    END as price,
-                    images,
-                    embedding <=> $1::vector as distance,
-                    1 - (embedding <=> $1::vector) as similarity_score
-                FROM listings_v2 
-                WHERE embedding IS NOT NULL
-                ORDER BY embedding <=> $1::vector
-                LIMIT {top_k}
-                """
-                
-                async with self.pool.acquire() as conn:
-                    rows = await conn.fetch(query, embedding_str)
-                    vector_results = [dict(row) for row in rows]
-                    
-                    logger.info(f"Full database vector search returned {len(vector_results)} candidates")
-                    
-                    return vector_results
-            
-            logger.info(f"Vector search on {len(candidate_ids)} candidates, top_k={top_k}")
+            logger.info("Vector search with %d filter params, top_k=%s", len(params), top_k)
             
             # Convert embedding to pgvector format
             embedding_str = f"[{','.join(map(str, embedding))}]"
-            
-            # Create placeholders for candidate IDs
-            id_placeholders = ','.join([f"${i+2}" for i in range(len(candidate_ids))])
+            distance = f"{self.ranking_column} <=> ${len(params) + 1}::{self.ranking_type}"
+            order_by = distance
+            if where_clause != UNFILTERED_WHERE_CLAUSE and not self.iterative_scan:
+                # HNSW only serves ORDER BY <column> <=> <query>, so this forces an exact
+                # sort over the rows the filter indexes select
+                order_by = f"({distance}) + 0"
             
             query = f"""
             SELECT 
-                id, title, address, bedrooms, bathrooms, square_feet,
-                garage_number, has_parking_lot, property_type,
-                price_for_sale, price_per_month,
-                has_yard, school_rating, crime_index, facing,
-                shopping_idx, grocery_idx, tags, embedding_text,
-                city, state, country, neighborhood,
-                description, amenities, host_id, is_available, is_featured,
-                latitude, longitude, rating, review_count,
-                property_listing_type, year_built, year_renovated,
-                created_at, updated_at,
-                CASE 
-                    WHEN property_listing_type = 'sale' THEN price_for_sale
-                    WHEN property_listing_type = 'both' THEN price_per_month
-                    WHEN property_listing_type = 'rent' THEN price_per_month
-                    ELSE COALESCE(price_per_month, price_for_sale)
-                END as price,
-                images,
-                embedding <=> $1::vector as distance,
-                1 - (embedding <=> $1::vector) as similarity_score
+                {SCORING_COLUMNS},
+                {distance} as distance,
+                1 - ({distance}) as similarity_score
             FROM listings_v2 
-            WHERE id IN ({id_placeholders})
-            ORDER BY embedding <=> $1::vector
-            LIMIT {top_k}
+            WHERE {where_clause}
+            ORDER BY {order_by}
+            LIMIT {int(top_k)}
             """
             
             async with self.pool.acquire() as conn:
-                rows = await conn.fetch(query, embedding_str, *candidate_ids)
+                rows = await conn.fetch(query, *params, embedding_str)
                 vector_results = [dict(row) for row in rows]
                 
-                logger.info(f"Vector search returned {len(vector_results)} candidates")
+                logger.info("Vector search returned %d candidates", len(vector_results))
                 
                 return vector_results
                 
         except Exception as e:
-            logger.error(f"Vector search error: {e}")
+            logger.error("Vector search error: %s", e)
+            raise
+    
+    async def load_embedding_matrix(self):
+        """Load listing embeddings into an in-memory matrix for full-catalog searches
+        
+        Only listings added or updated since the last load are fetched, and the
+        matrix is assembled in a worker thread rather than on the event loop.
+        """
+        try:
+            async with self.pool.acquire() as conn:
+                stamps = await conn.fetch("SELECT id, updated_at FROM listings_v2 WHERE embedding IS NOT NULL")
+                known = self._embedding_rows
+                changed = [
+                    row['id'] for row in stamps
+                    if row['id'] not in known or known[row['id']][0] != row['updated_at']
+                ]
+                rows = []
+                if changed:
+                    rows = await conn.fetch(
+                        "SELECT id, updated_at, embedding::real[] AS embedding FROM listings_v2 "
+                        "WHERE id = ANY($1) AND embedding IS NOT NULL",
+                        changed
+                    )
+        except Exception as e:
+            logger.error("Failed to load embedding matrix: %s", e)
+            raise
+        
+        self._embedding_rows, self.embedding_index = await asyncio.to_thread(_build_embedding_index, known, stamps, rows)
+        logger.info("Loaded embedding matrix with %d listings (%d fetched)", len(self._embedding_rows), len(rows))
+    
+    async def refresh_embedding_matrix(self, interval_seconds: float):
+        """Periodically reload the in-memory embedding matrix (run as a background task)"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.load_embedding_matrix()
+            except Exception as e:
+                logger.warning("Embedding matrix refresh failed, keeping previous matrix: %s", e)
+    
+    async def full_vector_search(self, embedding: List[float], top_k: int = 100) -> List[Dict[str, Any]]:
+        """Unfiltered vector search, ranked in-process when the embedding matrix is loaded"""
+        if self.embedding_index is None:
+            return await self.vector_search(embedding, top_k=top_k)
+        
+        ids, matrix = self.embedding_index
+        if not ids:
+            return []
+        
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vector)
+        if query_norm > 0:
+            query_vector /= query_norm
+        similarities = matrix @ query_vector
+        
+        if top_k < len(ids):
+            top = np.argpartition(-similarities, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        top_ids = [ids[i] for i in top]
+        
+        query = f"""
+        SELECT {SCORING_COLUMNS}
+        FROM listings_v2
+        WHERE id = ANY($1)
+        """
+        
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch(query, top_ids)
+        except Exception as e:
+            logger.error("Vector search error: %s", e)
+            raise
+        
+        rows_by_id = {row['id']: dict(row) for row in rows}
+        vector_results = []
+        for i, listing_id in zip(top, top_ids):
+            listing = rows_by_id.get(listing_id)
+            if listing is None:
+                # Deleted since the matrix was loaded
+                continue
+            similarity = float(similarities[i])
+            listing['distance'] = 1 - similarity
+            listing['similarity_score'] = similarity
+            vector_results.append(listing)
+        
+        logger.info("In-memory vector search returned %d candidates", len(vector_results))
+        return vector_results
+    
+    async def get_listing_details(self, listing_ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        """Fetch display columns for the given listings, keyed by listing id"""
+        if not listing_ids:
+            return {}
+        
+        query = f"""
+        SELECT {DETAIL_COLUMNS}
+        FROM listings_v2
+        WHERE id = ANY($1)
+        """
+        
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch(query, list(listing_ids))
+                return {row['id']: dict(row) for row in rows}
+        except Exception as e:
+            logger.error("Listing details query failed: %s", e)
             raise
     
     async def execute_query(self, query: str, *params) -> List[Dict[str, Any]]:
@@ -168,7 +356,7 @@ class DatabaseManager:
                 rows = await conn.fetch(query, *params)
                 return [dict(row) for row in rows]
         except Exception as e:
-            logger.error(f"Query execution error: {e}")
+            logger.error("Query execution error: %s", e)
             raise
     
     async def execute_query_single(self, query: str, *params) -> Optional[Dict[str, Any]]:
@@ -178,5 +366,5 @@ class DatabaseManager:
                 row = await conn.fetchrow(query, *params)
                 return dict(row) if row else None
         except Exception as e:
-            logger.error(f"Query execution error: {e}")
+            logger.error("Query execution error: %s", e)
             raise
@@ -6,7 +6,11 @@ Combines embedding text generation and embedding calculation in one pipeline
 
 import os
 import asyncio
+import hashlib
 import logging
+import sqlite3
+import time
+from array import array
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import sys
@@ -15,7 +19,8 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from etl.embedding_text import EmbeddingTextETL
-from etl.struct_tags import StructuredTagsETL
+from etl.struct_tags import StructuredTagsETL, TagHit
+import numpy as np
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
@@ -26,6 +31,78 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Maximum number of inputs OpenAI accepts in one embeddings request
+EMBEDDING_BATCH_SIZE = 2048
+
+class _EmbeddingDiskCache:
+    """Persistent embedding cache keyed by SHA-256 of model and input text"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(hash TEXT PRIMARY KEY, model TEXT, dim INTEGER, vec BLOB)"
+        )
+        self.conn.commit()
+    
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+    
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached embedding, or None on a miss"""
+        row = self.conn.execute(
+            "SELECT dim, vec FROM embeddings WHERE hash = ?", (self.key(model, text),)
+        ).fetchone()
+        if row is None:
+            return None
+        vector = array('f')
+        vector.frombytes(row[1])
+        return vector.tolist() if len(vector) == row[0] else None
+    
+    def put(self, model: str, text: str, embedding: List[float]):
+        """Store an embedding as a float32 blob"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO embeddings (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+            (self.key(model, text), model, len(embedding), array('f', embedding).tobytes())
+        )
+        self.conn.commit()
+    
+    def put_many(self, model: str, items: List[Tuple[str, List[float]]]):
+        """Store many (text, embedding) pairs in a single transaction"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+            [
+                (self.key(model, text), model, len(embedding), array('f', embedding).tobytes())
+                for text, embedding in items
+            ]
+        )
+        self.conn.commit()
+
+class AsyncTokenBucket:
+    """Token-bucket rate limiter for async API calls"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available, then take it"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 class EmbeddingPipelineETL:
     """Complete ETL pipeline for embedding generation"""
     
@@ -34,25 +111,83 @@ class EmbeddingPipelineETL:
         self.embedding_text_etl = EmbeddingTextETL()
         self.struct_tags_etl = StructuredTagsETL()
         self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Requests per second allowed against the OpenAI API
+        self.rate_limiter = AsyncTokenBucket(rate=float(os.getenv("OPENAI_RPS", 50)))
+        self.embedding_cache = _EmbeddingDiskCache(
+            os.getenv("EMBEDDING_CACHE_PATH", str(Path(__file__).parent / ".embedding_cache.sqlite3"))
+        )
         
     async def get_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding for text using OpenAI's text-embedding-3-small model"""
+        cached_embedding = self.embedding_cache.get(EMBEDDING_MODEL, text)
+        if cached_embedding is not None:
+            return cached_embedding
+        
         try:
+            await self.rate_limiter.acquire()
             response = await self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
+                model=EMBEDDING_MODEL,
                 input=text,
                 encoding_format="float"
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+            self.embedding_cache.put(EMBEDDING_MODEL, text, embedding)
+            return embedding
         except Exception as e:
-            logger.error(f"Failed to get embedding for text: {text[:100]}... Error: {e}")
+            logger.error("Failed to get embedding for text: %s... Error: %s", text[:100], e)
             return None
     
-    def enhance_listing_with_tags(self, listing: Dict[str, Any]) -> Dict[str, Any]:
-        """Enhance listing data with structured tags"""
+    async def get_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Generate embeddings for many texts with as few API requests as possible
+        
+        Empty texts and failed requests yield None at the matching position.
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        # Identical texts (e.g. sale and rent copies of a listing) are embedded once
+        pending: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            if text in pending:
+                pending[text].append(i)
+                continue
+            cached_embedding = self.embedding_cache.get(EMBEDDING_MODEL, text)
+            if cached_embedding is not None:
+                embeddings[i] = cached_embedding
+            else:
+                pending[text] = [i]
+        
+        pending_texts = list(pending)
+        for start in range(0, len(pending_texts), EMBEDDING_BATCH_SIZE):
+            chunk = pending_texts[start:start + EMBEDDING_BATCH_SIZE]
+            try:
+                await self.rate_limiter.acquire()
+                response = await self.openai_client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=chunk,
+                    encoding_format="float"
+                )
+            except Exception as e:
+                logger.error("Failed to get embeddings for %d texts. Error: %s", len(chunk), e)
+                continue
+            
+            fetched = []
+            for item in response.data:
+                text = chunk[item.index]
+                for i in pending[text]:
+                    embeddings[i] = item.embedding
+                fetched.append((text, item.embedding))
+            # One sqlite commit per request rather than one per embedding
+            self.embedding_cache.put_many(EMBEDDING_MODEL, fetched)
+        
+        return embeddings
+    
+    def enhance_listing_with_tags(self, listing: Dict[str, Any], tag_hits: Optional[List[TagHit]] = None) -> Dict[str, Any]:
+        """Enhance listing data with structured tags (extracted here unless already given)"""
         try:
             # Generate structured tags
-            tag_hits = self.struct_tags_etl.extract_struct_tags(listing)
+            if tag_hits is None:
+                tag_hits = self.struct_tags_etl.extract_struct_tags(listing)
             tag_names = self.struct_tags_etl.get_tag_names(tag_hits)
             
             # Add tags to listing data for embedding text generation
@@ -61,14 +196,14 @@ class EmbeddingPipelineETL:
             
             return enhanced_listing
         except Exception as e:
-            logger.warning(f"Failed to enhance listing with tags: {e}")
+            logger.warning("Failed to enhance listing with tags: %s", e)
             return listing
     
-    def build_enhanced_embedding_text(self, listing: Dict[str, Any]) -> str:
+    def build_enhanced_embedding_text(self, listing: Dict[str, Any], tag_hits: Optional[List[TagHit]] = None) -> str:
         """Build enhanced embedding text using both ETL components"""
         try:
             # First, enhance listing with structured tags
-            enhanced_listing = self.enhance_listing_with_tags(listing)
+            enhanced_listing = self.enhance_listing_with_tags(listing, tag_hits)
             
             # Generate embedding text with semantic cues
             embedding_text = self.embedding_text_etl.process_listing(enhanced_listing)
@@ -91,7 +226,7 @@ class EmbeddingPipelineETL:
             return embedding_text
             
         except Exception as e:
-            logger.error(f"Failed to build enhanced embedding text: {e}")
+            logger.error("Failed to build enhanced embedding text: %s", e)
             # Fallback to basic embedding text
             return self.embedding_text_etl.process_listing(listing)
     
@@ -111,18 +246,44 @@ class EmbeddingPipelineETL:
             return embedding_text, embedding_vector, tag_objects
             
         except Exception as e:
-            logger.error(f"Failed to process listing {listing.get('id', 'unknown')}: {e}")
+            logger.error("Failed to process listing %s: %s", listing.get('id', 'unknown'), e)
             return "", None, []
     
+    async def process_listings_batch(self, listings: List[Dict[str, Any]]) -> List[Tuple[str, Optional[List[float]], List[str]]]:
+        """Process listings through the complete pipeline, batching the embedding requests"""
+        embedding_texts = []
+        tag_objects_list = []
+        # Structured tags for the whole batch in one pass, shared by the text and the stored tags
+        tag_hits_list = self.struct_tags_etl.extract_struct_tags_batch(listings)
+        for listing, tag_hits in zip(listings, tag_hits_list):
+            try:
+                embedding_texts.append(self.build_enhanced_embedding_text(listing, tag_hits))
+                tag_objects_list.append(self.struct_tags_etl.get_tag_objects(tag_hits))
+            except Exception as e:
+                logger.error("Failed to process listing %s: %s", listing.get('id', 'unknown'), e)
+                embedding_texts.append("")
+                tag_objects_list.append([])
+        
+        embedding_vectors = await self.get_embeddings(embedding_texts)
+        return list(zip(embedding_texts, embedding_vectors, tag_objects_list))
+    
     def format_embedding_for_db(self, embedding_vector: List[float]) -> str:
-        """Format embedding vector for database storage"""
+        """Format embedding vector for database storage
+        
+        pgvector stores float32, so the vector is L2-normalized in float32 and each
+        component written with the shortest float32 repr instead of a float64 one.
+        """
         if not embedding_vector:
             return None
-        return f"[{','.join(map(str, embedding_vector))}]"
+        vector = np.asarray(embedding_vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return f"[{','.join(map(str, vector))}]"
     
     async def process_batch(self, listings: List[Dict[str, Any]], 
-                          update_callback=None) -> Dict[str, Any]:
-        """Process a batch of listings"""
+                          update_callback=None, max_concurrency: int = 4) -> Dict[str, Any]:
+        """Process a batch of listings, running up to max_concurrency update callbacks at once"""
         results = {
             'processed': 0,
             'successful': 0,
@@ -130,14 +291,26 @@ class EmbeddingPipelineETL:
             'errors': []
         }
         
-        logger.info(f"Processing batch of {len(listings)} listings...")
+        logger.info("Processing batch of %d listings...", len(listings))
         
-        for i, listing in enumerate(listings):
+        # Process all listings through the pipeline with batched embedding requests
+        try:
+            processed_listings = await self.process_listings_batch(listings)
+        except Exception as e:
+            # The shared embedding/tagging step failed, so no listing in the batch can be stored
+            for i, listing in enumerate(listings):
+                results['failed'] += 1
+                error_msg = f"Error processing listing {listing.get('id', f'listing_{i}')}: {e}"
+                results['errors'].append(error_msg)
+                logger.error("Error: %s", error_msg)
+            return results
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def store_listing(i: int, listing: Dict[str, Any], processed: Tuple[str, Optional[List[float]], List[str]]):
             try:
                 listing_id = listing.get('id', f'listing_{i}')
-                
-                # Process listing through pipeline
-                embedding_text, embedding_vector, tag_objects = await self.process_listing(listing)
+                embedding_text, embedding_vector, tag_objects = processed
                 
                 if embedding_text and embedding_vector:
                     # Format data for database update
@@ -150,7 +323,8 @@ class EmbeddingPipelineETL:
                     
                     # Call update callback if provided
                     if update_callback:
-                        success = await update_callback(listing_id, update_data)
+                        async with semaphore:
+                            success = await update_callback(listing_id, update_data)
                         if success:
                             results['successful'] += 1
                         else:
@@ -158,34 +332,44 @@ class EmbeddingPipelineETL:
                     else:
                         results['successful'] += 1
                     
-                    logger.info(f"Processed listing {listing_id} ({i+1}/{len(listings)})")
-                    logger.debug(f"   Text length: {len(embedding_text)} chars")
-                    logger.debug(f"   Tags: {len(tag_objects)} tags")
+                    logger.info("Processed listing %s (%s/%d)", listing_id, i+1, len(listings))
+                    logger.debug("   Text length: %d chars", len(embedding_text))
+                    logger.debug("   Tags: %d tags", len(tag_objects))
                     
                 else:
                     results['failed'] += 1
                     error_msg = f"Failed to generate embedding for listing {listing_id}"
                     results['errors'].append(error_msg)
-                    logger.warning(f"Error: {error_msg}")
+                    logger.warning("Error: %s", error_msg)
                 
                 results['processed'] += 1
                 
-                # Rate limiting delay
-                await asyncio.sleep(2.0)
-                
             except Exception as e:
                 results['failed'] += 1
                 error_msg = f"Error processing listing {listing.get('id', f'listing_{i}')}: {e}"
                 results['errors'].append(error_msg)
-                logger.error(f"Error: {error_msg}")
-                continue
+                logger.error("Error: %s", error_msg)
+        
+        await asyncio.gather(*(
+            store_listing(i, listing, processed)
+            for i, (listing, processed) in enumerate(zip(listings, processed_listings))
+        ))
         
         return results
 
+_pipeline_singleton: Optional[EmbeddingPipelineETL] = None
+
+def get_pipeline() -> EmbeddingPipelineETL:
+    """Return the shared pipeline, creating it (config, tag rules, OpenAI client) on first use"""
+    global _pipeline_singleton
+    if _pipeline_singleton is None:
+        _pipeline_singleton = EmbeddingPipelineETL()
+    return _pipeline_singleton
+
 def main():
     """Test the complete ETL pipeline"""
     async def test_pipeline():
-        pipeline = EmbeddingPipelineETL()
+        pipeline = get_pipeline()
         
         # Sample listing data
         sample_listing = {
@@ -215,32 +399,40 @@ def main():
         # Process listing
         embedding_text, embedding_vector, tag_objects = await pipeline.process_listing(sample_listing)
         
-        print("=== ETL Pipeline Test Results ===")
-        print(f"\n📝 Embedding Text ({len(embedding_text)} chars):")
-        print(embedding_text)
+        # Collect the report and write it once
+        output = ["=== ETL Pipeline Test Results ==="]
+        output.append(f"\n📝 Embedding Text ({len(embedding_text)} chars):")
+        output.append(embedding_text)
         
-        print(f"\n🔢 Embedding Vector:")
+        output.append(f"\n🔢 Embedding Vector:")
         if embedding_vector:
-            print(f"   Dimensions: {len(embedding_vector)}")
-            print(f"   Sample values: {embedding_vector[:5]}...")
+            output.append(f"   Dimensions: {len(embedding_vector)}")
+            output.append(f"   Sample values: {embedding_vector[:5]}...")
         else:
-            print("   Failed to generate embedding")
+            output.append("   Failed to generate embedding")
         
-        print(f"\nStructured Tags ({len(tag_objects)} tags):")
+        output.append(f"\nStructured Tags ({len(tag_objects)} tags):")
         for tag in tag_objects:
-            print(f"   • {tag['tag']}: {tag['evidence']}")
+            output.append(f"   • {tag['tag']}: {tag['evidence']}")
         
-        print(f"\n💾 Database Update Data:")
+        output.append(f"\n💾 Database Update Data:")
         update_data = {
             'embedding_text': embedding_text,
             'embedding': pipeline.format_embedding_for_db(embedding_vector),
             'tags': tag_objects
         }
-        print(f"   embedding_text: {len(embedding_text)} chars")
-        print(f"   embedding: {len(embedding_vector) if embedding_vector else 0} dimensions")
-        print(f"   tags: {len(tag_objects)} tags")
+        output.append(f"   embedding_text: {len(embedding_text)} chars")
+        output.append(f"   embedding: {len(embedding_vector) if embedding_vector else 0} dimensions")
+        output.append(f"   tags: {len(tag_objects)} tags")
+        
+        sys.stdout.write("\n".join(output) + "\n")
     
-    # Run the test
+    # Run the test, on uvloop when it is available
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:  # uvloop is optional (not available on Windows)
+        pass
     asyncio.run(test_pipeline())
 
 if __name__ == "__main__":
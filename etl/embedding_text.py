@@ -6,6 +6,7 @@ Build embedding_text from prose (title/description) using semantic cue extractio
 
 import yaml
 import re
+import functools
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import logging
@@ -14,6 +15,13 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=None)
+def _read_config_file(config_path: Path) -> Dict[str, Any]:
+    """Parse a keyword configuration file once per process"""
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
 class EmbeddingTextETL:
     """ETL for generating embedding_text from title and description"""
     
@@ -25,11 +33,29 @@ class EmbeddingTextETL:
         self.negative_keywords = self.config.get('negative_keywords', {})
         self.context_rules = self.config.get('context_rules', [])
         
+        # Compile each context rule's pattern and condition once, not on every listing
+        self.compiled_context_rules = []
+        for rule in self.context_rules:
+            if not (rule.get('pattern') and rule.get('cue')):
+                continue
+            try:
+                condition = compile(rule['condition'], '<context_rule>', 'eval') if rule.get('condition') else None
+            except SyntaxError as e:
+                logger.warning(f"Error evaluating context rule, skipping it: {e}")
+                continue
+            self.compiled_context_rules.append((re.compile(rule['pattern'], re.IGNORECASE), condition, rule['cue']))
+        
+        # Lowercase every phrase once; positive and negative phrases are matched the same way
+        self.keyword_cues = tuple(
+            (phrase.lower(), cue)
+            for keywords in (self.positive_keywords, self.negative_keywords)
+            for phrase, cue in keywords.items()
+        )
+        
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from YAML file"""
         try:
-            with open(self.config_path, 'r') as f:
-                return yaml.safe_load(f)
+            return _read_config_file(self.config_path.resolve())
         except Exception as e:
             logger.error(f"Failed to load config from {self.config_path}: {e}")
             return {}
@@ -39,37 +65,21 @@ class EmbeddingTextETL:
         cues = set()
         text = f"{title} {description}".lower()
         
-        # Extract positive keywords
-        for phrase, cue in self.positive_keywords.items():
-            if phrase.lower() in text:
-                cues.add(cue)
-        
-        # Extract negative keywords
-        for phrase, cue in self.negative_keywords.items():
-            if phrase.lower() in text:
+        # Extract positive and negative keywords, skipping phrases whose cue is already found
+        for phrase, cue in self.keyword_cues:
+            if cue not in cues and phrase in text:
                 cues.add(cue)
         
         # Apply context-specific rules
-        for rule in self.context_rules:
-            pattern = rule.get('pattern', '')
-            condition = rule.get('condition', '')
-            cue = rule.get('cue', '')
-            
-            if pattern and cue:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    try:
-                        # Evaluate condition if provided
-                        if condition:
-                            # Create a simple condition evaluator
-                            condition_eval = condition.replace('match.group(1)', f"'{match.group(1)}'")
-                            if eval(condition_eval):
-                                cues.add(cue)
-                        else:
-                            cues.add(cue)
-                    except Exception as e:
-                        logger.warning(f"Error evaluating context rule: {e}")
-                        continue
+        for pattern, condition, cue in self.compiled_context_rules:
+            for match in pattern.finditer(text):
+                try:
+                    # Evaluate condition if provided, with the current match in scope
+                    if condition is None or eval(condition, globals(), {'match': match}):
+                        cues.add(cue)
+                except Exception as e:
+                    logger.warning(f"Error evaluating context rule: {e}")
+                    continue
         
         return list(cues)
     
@@ -6,16 +6,354 @@ Generate tags from structured listing fields using rule-based configuration
 
 import yaml
 import re
-from typing import List, Dict, Any, Optional
+import sys
+import string
+import operator
+import functools
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
 from pathlib import Path
 import logging
 
+import numpy as np
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Facing directions accepted by normalize_facing
+_VALID_FACINGS = frozenset({'N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW'})
+
+# Strings normalize_boolean treats as true (compared lowercased)
+_TRUE_STRINGS = frozenset({'true', '1', 'yes', 'on'})
+
+# Precomputed results for the raw values boolean fields usually hold; 1/0 and
+# 1.0/0.0 hash like True/False and normalize the same way
+_BOOLEAN_LOOKUP = {
+    True: True, False: False, None: False,
+    'true': True, 'false': False, '1': True, '0': False,
+    'yes': True, 'no': False, 'on': True, 'off': False,
+}
+_BOOLEAN_LOOKUP_TYPES = frozenset({bool, int, float, str, type(None)})
+
+# Raw listing fields read when building the condition context
+_CONTEXT_FIELDS = (
+    'facing', 'distance_to_metro_m', 'has_parking_lot', 'garage_number', 'year_renovated',
+    'school_rating', 'crime_index', 'has_yard', 'shopping_idx', 'grocery_idx',
+    'property_type', 'square_feet', 'bedrooms', 'bathrooms',
+)
+
+# Marks a field absent from the listing in memo keys (distinct from an explicit None)
+_MISSING = object()
+
+# Comparison operators, in the order evaluate_condition tries them
+_COMPARISON_OPERATORS = {
+    '<=': operator.le,
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<': operator.lt,
+    '==': operator.eq,
+}
+
+# References to configured thresholds inside rule conditions, e.g. "thresholds.school_rating"
+_THRESHOLD_REFERENCE = re.compile(r'\bthresholds\.(\w+)')
+
+# C-level accessor for TagHit.tag used on the per-listing path
+_get_tag = operator.attrgetter('tag')
+
+
+
+def _normalize_facing(facing: Optional[str]) -> Optional[str]:
+    """Normalize facing direction to enum values"""
+    if not facing:
+        return None
+    
+    # Convert to uppercase and validate
+    facing = facing.upper()
+    return facing if facing in _VALID_FACINGS else None
+
+
+def _normalize_distance(distance: Optional[float]) -> Optional[float]:
+    """Normalize distance to meters"""
+    if distance is None:
+        return None
+    return float(distance)
+
+
+def _normalize_boolean(value: Any) -> bool:
+    """Normalize boolean values"""
+    # Exact built-in types only, so e.g. numpy scalars keep the checks below
+    if type(value) in _BOOLEAN_LOOKUP_TYPES:
+        normalized = _BOOLEAN_LOOKUP.get(value)
+        if normalized is not None:
+            return normalized
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.lower() in _TRUE_STRINGS
+    if isinstance(value, (int, float)):
+        return bool(value)
+    return False
+
+
+def _normalize_year(year: Optional[int]) -> Optional[int]:
+    """Normalize year values"""
+    if year is None:
+        return None
+    year = int(year)
+    # Basic validation: reasonable year range (1900-2030) as one offset check
+    if 0 <= year - 1900 <= 130:
+        return year
+    return None
+
+
+def _normalize_listing(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize every field rule conditions read in one pass (missing fields get defaults)
+    
+    Same results as the _normalize_* helpers, with their common cases inlined.
+    """
+    get = listing.get
+    
+    facing = get('facing')
+    if facing:
+        facing = facing.upper()
+        if facing not in _VALID_FACINGS:
+            facing = None
+    else:
+        facing = None
+    
+    distance = get('distance_to_metro_m')
+    if distance is not None:
+        distance = float(distance)
+    
+    has_parking_lot = get('has_parking_lot')
+    normalized = _BOOLEAN_LOOKUP.get(has_parking_lot) if type(has_parking_lot) in _BOOLEAN_LOOKUP_TYPES else None
+    has_parking_lot = _normalize_boolean(has_parking_lot) if normalized is None else normalized
+    
+    year = get('year_renovated')
+    if year is not None:
+        year = int(year)
+        if not 0 <= year - 1900 <= 130:
+            year = None
+    
+    has_yard = get('has_yard')
+    normalized = _BOOLEAN_LOOKUP.get(has_yard) if type(has_yard) in _BOOLEAN_LOOKUP_TYPES else None
+    has_yard = _normalize_boolean(has_yard) if normalized is None else normalized
+    
+    return {
+        'facing': facing,
+        'distance_to_metro_m': distance,
+        'has_parking_lot': has_parking_lot,
+        'garage_number': get('garage_number', 0),
+        'year_renovated': year,
+        'school_rating': get('school_rating'),
+        'crime_index': get('crime_index'),
+        'has_yard': has_yard,
+        'shopping_idx': get('shopping_idx'),
+        'grocery_idx': get('grocery_idx'),
+        'property_type': get('property_type'),
+        'square_feet': get('square_feet'),
+        'bedrooms': get('bedrooms'),
+        'bathrooms': get('bathrooms'),
+    }
+
+
+def _parse_condition(condition: str) -> tuple:
+    """Parse a rule condition into a tree that follows evaluate_condition's rules
+    
+    Nodes are ('any', parts), ('all', parts), ('eq', text, field, value),
+    ('compare', text, field, op, value_text, number), ('in', text, field, values)
+    and ('never', text); number is None when value_text is not numeric.
+    """
+    if " OR " in condition:
+        return ('any', [_parse_condition(part.strip()) for part in condition.split(" OR ")])
+    if " AND " in condition:
+        return ('all', [_parse_condition(part.strip()) for part in condition.split(" AND ")])
+    
+    text = condition.strip()
+    if " == '" in text:
+        field = text.split(" == '")[0].strip()
+        value = text.split(" == '")[1].split("'")[0]
+        return ('eq', text, field, value)
+    
+    # Boolean comparisons (" == true") also land here and compare against the text
+    for op in _COMPARISON_OPERATORS:
+        if op in text:
+            field = text.split(op)[0].strip()
+            value_text = text.split(op)[1].strip()
+            try:
+                number = float(value_text)
+            except ValueError:
+                number = None
+            return ('compare', text, field, op, value_text, number)
+    
+    if " in [" in text:
+        field = text.split(" in [")[0].strip()
+        values_part = text.split(" in [")[1].split("]")[0]
+        return ('in', text, field, [v.strip().strip("'") for v in values_part.split(",")])
+    
+    return ('never', text)
+
+
+def _evaluate_atom(node: tuple, value: Any) -> bool:
+    """Evaluate a single-field condition node against a normalized field value"""
+    kind = node[0]
+    try:
+        if kind == 'eq':
+            return value == node[3]
+        if kind == 'compare':
+            if value is None:
+                return False
+            _, _, _, op, value_text, number = node
+            if number is None:
+                return value == value_text
+            try:
+                return _COMPARISON_OPERATORS[op](value, number)
+            except (ValueError, TypeError):
+                # Not comparable as a number, fall back to string comparison
+                return value == value_text
+        if kind == 'in':
+            return value in node[3]
+        return False
+    except Exception as e:
+        logger.warning(f"Error evaluating condition '{node[1]}': {e}")
+        return False
+
+
+def _compile_condition(node: tuple) -> Callable[[Dict[str, Any]], bool]:
+    """Turn a condition tree into a predicate over a normalized context"""
+    kind = node[0]
+    if kind in ('any', 'all'):
+        parts = [_compile_condition(part) for part in node[1]]
+        if kind == 'any':
+            return lambda context: any(part(context) for part in parts)
+        return lambda context: all(part(context) for part in parts)
+    if kind == 'never':
+        return lambda context: False
+    
+    # Common value types take a direct path; anything else gets the full semantics
+    field = node[2]
+    if kind == 'compare' and node[5] is not None:
+        compare, number = _COMPARISON_OPERATORS[node[3]], node[5]
+        
+        def predicate(context):
+            value = context.get(field)
+            if type(value) in (int, float):
+                return compare(value, number)
+            return value is not None and _evaluate_atom(node, value)
+    elif kind in ('eq', 'in'):
+        expected = node[3]
+        
+        def predicate(context):
+            value = context.get(field)
+            if value is None or type(value) is str:
+                return value == expected if kind == 'eq' else value in expected
+            return _evaluate_atom(node, value)
+    else:
+        def predicate(context):
+            return _evaluate_atom(node, context.get(field))
+    return predicate
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_condition_text(condition: str) -> Callable[[Dict[str, Any]], bool]:
+    """Parse and compile a condition string (cached, conditions come from a small rule set)"""
+    return _compile_condition(_parse_condition(condition))
+
+
+def _template_fields(template: Any) -> set:
+    """Top-level listing fields an evidence template formats"""
+    if not isinstance(template, str):
+        return set()
+    try:
+        names = [field for _, field, _, _ in string.Formatter().parse(template) if field]
+    except ValueError:
+        # Malformed templates are returned unformatted, whatever the listing holds
+        return set()
+    return {re.split(r'[.\[]', name, maxsplit=1)[0] for name in names}
+
+
+def _numeric_column(values: List[Any]) -> tuple:
+    """Split a column into a float array (NaN where not a plain number) and the other, non-None positions"""
+    numbers = np.full(len(values), np.nan)
+    others = []
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        if isinstance(value, (int, float)):
+            try:
+                numbers[i] = value
+                continue
+            except OverflowError:
+                pass
+        others.append(i)
+    return numbers, others
+
+
+def _categorical_column(values: List[Any]) -> tuple:
+    """Encode a column's strings and Nones as integer codes (-1 elsewhere) plus the distinct values and other positions"""
+    codes = np.full(len(values), -1, dtype=np.intp)
+    categories: Dict[Optional[str], int] = {}
+    others = []
+    for i, value in enumerate(values):
+        if value is None or type(value) is str:
+            codes[i] = categories.setdefault(value, len(categories))
+        else:
+            others.append(i)
+    return codes, list(categories), others
+
+
+def _condition_fields(node: tuple) -> set:
+    """Names of the listing fields a condition tree reads"""
+    if node[0] in ('any', 'all'):
+        return set().union(*(_condition_fields(part) for part in node[1]))
+    if node[0] == 'never':
+        return set()
+    return {node[2]}
+
+
+def _evaluate_column(node: tuple, columns: Dict[str, List[Any]], encoded_columns: Dict[tuple, tuple], count: int) -> np.ndarray:
+    """Evaluate a condition tree over whole columns of normalized values at once
+    
+    encoded_columns caches each column's numeric / categorical encoding across rules.
+    """
+    kind = node[0]
+    if kind == 'any':
+        return np.logical_or.reduce([_evaluate_column(part, columns, encoded_columns, count) for part in node[1]])
+    if kind == 'all':
+        return np.logical_and.reduce([_evaluate_column(part, columns, encoded_columns, count) for part in node[1]])
+    if kind == 'never':
+        return np.zeros(count, dtype=bool)
+    
+    values = columns[node[2]]
+    if kind == 'compare' and node[5] is not None:
+        # Plain numbers compare in one array operation (NaN, i.e. missing, never matches);
+        # anything else keeps the exact per-value semantics
+        key = ('numeric', node[2])
+        if key not in encoded_columns:
+            encoded_columns[key] = _numeric_column(values)
+        numbers, others = encoded_columns[key]
+        mask = _COMPARISON_OPERATORS[node[3]](numbers, node[5])
+        for i in others:
+            mask[i] = _evaluate_atom(node, values[i])
+        return mask
+    if kind in ('eq', 'in'):
+        # Low-cardinality text fields (facing, property_type): evaluate each distinct
+        # value once and match rows by integer code
+        key = ('categorical', node[2])
+        if key not in encoded_columns:
+            encoded_columns[key] = _categorical_column(values)
+        codes, categories, others = encoded_columns[key]
+        matches = np.fromiter((_evaluate_atom(node, value) for value in categories), dtype=bool, count=len(categories))
+        mask = np.isin(codes, np.flatnonzero(matches))
+        for i in others:
+            mask[i] = _evaluate_atom(node, values[i])
+        return mask
+    return np.fromiter((_evaluate_atom(node, value) for value in values), dtype=bool, count=count)
+
+
+@dataclass(slots=True, frozen=True, eq=False)
 class TagHit:
     """Represents a tag match with evidence"""
     tag: str
@@ -35,6 +373,82 @@ class StructuredTagsETL:
         self.rules = self.config.get('rules', [])
         self.rule_version = self.config.get('rule_version', '1.0.0')
         
+        # Every TagHit carries these strings, so intern them to share one copy each
+        if isinstance(self.rule_version, str):
+            self.rule_version = sys.intern(self.rule_version)
+        for rule in self.rules:
+            for key in ('name', 'tag'):
+                if isinstance(rule.get(key), str):
+                    rule[key] = sys.intern(rule[key])
+        
+        # Parse and compile every rule condition once; rules without a condition never fire
+        self.compiled_rules = []
+        for rule in self.rules:
+            condition = rule.get('condition', '')
+            if condition:
+                tree = _parse_condition(self.resolve_thresholds(condition)) if isinstance(condition, str) else ('never', str(condition))
+                self.compiled_rules.append((rule, tree, _compile_condition(tree), self._prototype_tag_hit(rule)))
+        self.rule_tags = tuple(rule.get('tag', '') for rule, _, _, _ in self.compiled_rules)
+        self.tagged_rules = np.array([bool(tag) for tag in self.rule_tags], dtype=bool)
+        self.rule_fields = sorted(set().union(*(_condition_fields(tree) for _, tree, _, _ in self.compiled_rules)))
+        
+        # Index rules by the fields they read: a rule whose fields are all None gets the
+        # same answer for every such listing, so it only needs evaluating when a field
+        # is set (or when it fires on an all-None context)
+        self.rules_by_field: Dict[str, List[int]] = {}
+        self.unconditional_rules: List[int] = []
+        for index, (_, tree, predicate, _) in enumerate(self.compiled_rules):
+            fields = _condition_fields(tree)
+            try:
+                fires_when_empty = predicate(dict.fromkeys(fields))
+            except Exception:
+                fires_when_empty = True
+            if fires_when_empty or not fields:
+                self.unconditional_rules.append(index)
+                continue
+            for field in fields:
+                self.rules_by_field.setdefault(field, []).append(index)
+        self.indexed_fields = tuple(self.rules_by_field)
+        self._active_rules_cache: Dict[tuple, List[int]] = {}
+        
+        # Tags depend only on these raw fields, so listings agreeing on them (re-runs,
+        # unchanged rows) reuse one result
+        template_fields = set().union(*(_template_fields(rule.get('evidence_template', '')) for rule, _, _, _ in self.compiled_rules))
+        self.memo_fields = tuple(sorted(set(_CONTEXT_FIELDS) | template_fields))
+        self.tag_cache_size = 65536
+        self._tag_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+    
+    def resolve_thresholds(self, condition: str) -> str:
+        """Substitute configured threshold values for thresholds.<name> references in a condition"""
+        def substitute(match):
+            name = match.group(1)
+            if name not in (self.thresholds or {}):
+                logger.warning(f"Unknown threshold '{name}' in condition '{condition}'")
+                return match.group(0)
+            return str(self.thresholds[name])
+        
+        return _THRESHOLD_REFERENCE.sub(substitute, condition)
+    
+    def _prototype_tag_hit(self, rule: Dict[str, Any]) -> Optional[TagHit]:
+        """The shared TagHit for a rule whose evidence does not depend on the listing, if any"""
+        template = rule.get('evidence_template', '')
+        if not rule.get('tag', '') or _template_fields(template):
+            return None
+        return self._make_tag_hit(rule, {})
+    
+    def _make_tag_hit(self, rule: Dict[str, Any], listing: Dict[str, Any]) -> Optional[TagHit]:
+        """Build the TagHit a fired rule produces for a listing (None for rules without a tag)"""
+        tag = rule.get('tag', '')
+        if not tag:
+            return None
+        return TagHit(
+            tag=tag,
+            evidence=self.format_evidence(rule.get('evidence_template', ''), listing),
+            source="structured",
+            rule_name=rule.get('name', ''),
+            rule_version=self.rule_version
+        )
+    
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from YAML file"""
         try:
@@ -46,131 +460,26 @@ class StructuredTagsETL:
     
     def normalize_facing(self, facing: Optional[str]) -> Optional[str]:
         """Normalize facing direction to enum values"""
-        if not facing:
-            return None
-        
-        # Convert to uppercase and validate
-        facing = facing.upper()
-        valid_facings = {'N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW'}
-        
-        return facing if facing in valid_facings else None
+        return _normalize_facing(facing)
     
     def normalize_distance(self, distance: Optional[float]) -> Optional[float]:
         """Normalize distance to meters"""
-        if distance is None:
-            return None
-        return float(distance)
+        return _normalize_distance(distance)
     
     def normalize_boolean(self, value: Any) -> bool:
         """Normalize boolean values"""
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, str):
-            return value.lower() in {'true', '1', 'yes', 'on'}
-        if isinstance(value, (int, float)):
-            return bool(value)
-        return False
+        return _normalize_boolean(value)
     
     def normalize_year(self, year: Optional[int]) -> Optional[int]:
         """Normalize year values"""
-        if year is None:
-            return None
-        year = int(year)
-        # Basic validation: reasonable year range
-        if 1900 <= year <= 2030:
-            return year
-        return None
+        return _normalize_year(year)
     
     def evaluate_condition(self, condition: str, listing: Dict[str, Any]) -> bool:
         """Evaluate a condition string against listing data"""
         try:
             # Create a safe evaluation context with defaults for missing fields
-            context = {
-                'facing': self.normalize_facing(listing.get('facing')),
-                'distance_to_metro_m': self.normalize_distance(listing.get('distance_to_metro_m')),
-                'has_parking_lot': self.normalize_boolean(listing.get('has_parking_lot')),
-                'garage_number': listing.get('garage_number', 0),
-                'year_renovated': self.normalize_year(listing.get('year_renovated')),
-                'school_rating': listing.get('school_rating'),
-                'crime_index': listing.get('crime_index'),
-                'has_yard': self.normalize_boolean(listing.get('has_yard')),
-                'shopping_idx': listing.get('shopping_idx'),
-                'grocery_idx': listing.get('grocery_idx'),
-                'property_type': listing.get('property_type'),
-                'square_feet': listing.get('square_feet'),
-                'bedrooms': listing.get('bedrooms'),
-                'bathrooms': listing.get('bathrooms'),
-            }
-            
-            # Handle OR conditions first
-            if " OR " in condition:
-                parts = condition.split(" OR ")
-                return any(self.evaluate_condition(part.strip(), listing) for part in parts)
-            
-            # Handle AND conditions
-            if " AND " in condition:
-                parts = condition.split(" AND ")
-                return all(self.evaluate_condition(part.strip(), listing) for part in parts)
-            
-            # Handle individual conditions
-            condition_eval = condition.strip()
-            
-            # Handle string equality
-            if " == '" in condition_eval:
-                # Extract field and value
-                field_part = condition_eval.split(" == '")[0].strip()
-                value_part = condition_eval.split(" == '")[1].split("'")[0]
-                field_value = context.get(field_part)
-                return field_value == value_part
-            
-            # Handle numeric comparisons
-            for op in ['<=', '>=', '>', '<', '==']:
-                if op in condition_eval:
-                    field_part = condition_eval.split(op)[0].strip()
-                    value_part = condition_eval.split(op)[1].strip()
-                    field_value = context.get(field_part)
-                    
-                    # Skip if field is None
-                    if field_value is None:
-                        return False
-                    
-                    try:
-                        if op == '<=':
-                            return field_value <= float(value_part)
-                        elif op == '>=':
-                            return field_value >= float(value_part)
-                        elif op == '>':
-                            return field_value > float(value_part)
-                        elif op == '<':
-                            return field_value < float(value_part)
-                        elif op == '==':
-                            return field_value == float(value_part)
-                    except (ValueError, TypeError):
-                        # If value_part is not a number, try string comparison
-                        return field_value == value_part
-            
-            # Handle boolean comparisons
-            if " == true" in condition_eval:
-                field_part = condition_eval.split(" == true")[0].strip()
-                field_value = context.get(field_part)
-                return field_value is True
-            elif " == false" in condition_eval:
-                field_part = condition_eval.split(" == false")[0].strip()
-                field_value = context.get(field_part)
-                return field_value is False
-            
-            # Handle list membership (e.g., "property_type in ['Penthouse', 'Villa']")
-            if " in [" in condition_eval:
-                field_part = condition_eval.split(" in [")[0].strip()
-                values_part = condition_eval.split(" in [")[1].split("]")[0]
-                field_value = context.get(field_part)
-                
-                # Parse the list of values
-                values = [v.strip().strip("'") for v in values_part.split(",")]
-                return field_value in values
-            
-            return False
-            
+            context = _normalize_listing(listing)
+            return _compile_condition_text(self.resolve_thresholds(condition))(context)
         except Exception as e:
             logger.warning(f"Error evaluating condition '{condition}': {e}")
             return False
@@ -184,30 +493,61 @@ class StructuredTagsETL:
             return template
     
     def extract_struct_tags(self, listing: Dict[str, Any]) -> List[TagHit]:
-        """Extract structured tags from listing data"""
+        """Extract structured tags from listing data, reusing results for identical field values"""
+        values = tuple(listing.get(field, _MISSING) for field in self.memo_fields)
+        # Types are part of the key: 1 and True hash alike but format differently
+        key = values + tuple(map(type, values))
+        try:
+            cached = self._tag_cache.get(key)
+        except TypeError:
+            # Unhashable field values (e.g. lists) are not memoized
+            return self._extract_struct_tags(listing)
+        
+        if cached is None:
+            cached = tuple(self._extract_struct_tags(listing))
+            self._tag_cache[key] = cached
+            if len(self._tag_cache) > self.tag_cache_size:
+                self._tag_cache.popitem(last=False)
+        else:
+            self._tag_cache.move_to_end(key)
+        return list(cached)
+    
+    def _active_rules(self, context: Dict[str, Any]) -> List[int]:
+        """Indices of the compiled rules that can fire for a context, in rule order
+        
+        Only rules reading at least one set field can fire; the selection depends
+        only on which indexed fields are set, so it is cached per presence pattern.
+        """
+        present = tuple([context.get(field) is not None for field in self.indexed_fields])
+        rules = self._active_rules_cache.get(present)
+        if rules is None:
+            active = set(self.unconditional_rules)
+            for field, is_set in zip(self.indexed_fields, present):
+                if is_set:
+                    active.update(self.rules_by_field[field])
+            rules = sorted(active)
+            self._active_rules_cache[present] = rules
+        return rules
+    
+    def _extract_struct_tags(self, listing: Dict[str, Any]) -> List[TagHit]:
+        """Evaluate every rule against the listing (uncached)"""
         tag_hits = []
         
-        for rule in self.rules:
+        # Normalize the listing once for all rules
+        try:
+            context = _normalize_listing(listing)
+        except Exception as e:
+            logger.warning(f"Error evaluating conditions for listing {listing.get('id', 'unknown')}: {e}")
+            return tag_hits
+        
+        compiled_rules = self.compiled_rules
+        for index in self._active_rules(context):
+            rule, _, predicate, prototype = compiled_rules[index]
             try:
-                condition = rule.get('condition', '')
-                if not condition:
-                    continue
-                
-                # Evaluate the condition
-                if self.evaluate_condition(condition, listing):
-                    tag = rule.get('tag', '')
-                    evidence_template = rule.get('evidence_template', '')
-                    rule_name = rule.get('name', '')
-                    
-                    if tag:
-                        evidence = self.format_evidence(evidence_template, listing)
-                        tag_hit = TagHit(
-                            tag=tag,
-                            evidence=evidence,
-                            source="structured",
-                            rule_name=rule_name,
-                            rule_version=self.rule_version
-                        )
+                # Evaluate the condition; rules with fixed evidence share one TagHit
+                if predicate(context):
+                    tag_hit = prototype or self._make_tag_hit(rule, listing)
+                    if tag_hit is not None:
                         tag_hits.append(tag_hit)
                         
             except Exception as e:
@@ -216,9 +556,87 @@ class StructuredTagsETL:
         
         return tag_hits
     
+    def extract_struct_tag_mask(self, listing: Dict[str, Any]) -> int:
+        """Fired tags for one listing as a bitmask (bit i = compiled_rules[i], as in extract_struct_tag_masks)"""
+        try:
+            context = _normalize_listing(listing)
+        except Exception as e:
+            logger.warning(f"Error evaluating conditions for listing {listing.get('id', 'unknown')}: {e}")
+            return 0
+        
+        mask = 0
+        for index in self._active_rules(context):
+            if not self.rule_tags[index]:
+                continue
+            rule, _, predicate, _ = self.compiled_rules[index]
+            try:
+                if predicate(context):
+                    mask |= 1 << index
+            except Exception as e:
+                logger.warning(f"Error processing rule {rule.get('name', 'unknown')}: {e}")
+        return mask
+    
+    def tag_names_from_mask(self, mask: int) -> List[str]:
+        """Tag names for the bits set in a tag mask, in rule order"""
+        mask = int(mask)
+        return [tag for index, tag in enumerate(self.rule_tags) if mask >> index & 1]
+    
+    def extract_struct_tags_batch(self, listings: List[Dict[str, Any]]) -> List[List[TagHit]]:
+        """Extract structured tags for many listings, evaluating each rule over all of them at once
+        
+        Produces the same tags as calling extract_struct_tags on each listing.
+        """
+        fired = self._fired_rules(listings)
+        
+        tag_hits = [[] for _ in range(len(listings))]
+        for row, rule_index in zip(*np.nonzero(fired)):
+            rule, _, _, prototype = self.compiled_rules[rule_index]
+            tag_hit = prototype or self._make_tag_hit(rule, listings[row])
+            if tag_hit is not None:
+                tag_hits[row].append(tag_hit)
+        
+        return tag_hits
+    
+    def extract_struct_tag_masks(self, listings: List[Dict[str, Any]]) -> np.ndarray:
+        """Fired tags for many listings as one bitmask per listing
+        
+        Bit i is set when compiled_rules[i] fired and has a tag; the array is
+        uint32, or uint64 for more than 32 rules.
+        """
+        rule_count = len(self.compiled_rules)
+        if rule_count > 64:
+            raise ValueError(f"Cannot pack {rule_count} rules into a 64-bit tag mask")
+        dtype = np.uint32 if rule_count <= 32 else np.uint64
+        
+        fired = self._fired_rules(listings) & self.tagged_rules
+        bits = fired.astype(dtype) << np.arange(rule_count, dtype=dtype)
+        return np.bitwise_or.reduce(bits, axis=1)
+    
+    def _fired_rules(self, listings: List[Dict[str, Any]]) -> np.ndarray:
+        """Boolean (listings x compiled rules) matrix of fired conditions"""
+        count = len(listings)
+        contexts = []
+        valid = np.ones(count, dtype=bool)
+        for i, listing in enumerate(listings):
+            try:
+                contexts.append(_normalize_listing(listing))
+            except Exception as e:
+                # A listing whose fields cannot be normalized matches no condition
+                logger.warning(f"Error evaluating conditions for listing {listing.get('id', 'unknown')}: {e}")
+                contexts.append({})
+                valid[i] = False
+        
+        columns = {field: [context.get(field) for context in contexts] for field in self.rule_fields}
+        encoded_columns = {}
+        fired = np.zeros((count, len(self.compiled_rules)), dtype=bool)
+        for rule_index, (_, tree, _, _) in enumerate(self.compiled_rules):
+            fired[:, rule_index] = _evaluate_column(tree, columns, encoded_columns, count)
+        fired &= valid[:, None]
+        return fired
+    
     def get_tag_names(self, tag_hits: List[TagHit]) -> List[str]:
         """Extract just the tag names from TagHit objects"""
-        return [hit.tag for hit in tag_hits]
+        return list(map(_get_tag, tag_hits))
     
     def get_tag_objects(self, tag_hits: List[TagHit]) -> List[Dict[str, Any]]:
         """Convert TagHit objects to dictionary format for JSONB storage"""
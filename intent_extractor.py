@@ -3,14 +3,16 @@ Intent extraction module for DreamHeaven RAG API
 """
 
 import re
+import copy
 import logging
+import functools
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchIntent:
     """Search intent extracted from natural language query"""
     # Hard filters
@@ -45,232 +47,259 @@ class SearchIntent:
     dining_options: bool = False
     short_term_rental: bool = False
     pet_friendly: bool = False
+    
+    def signature(self) -> tuple:
+        """Hashable tuple of all fields, in declaration order (usable as a cache key)"""
+        return tuple(getattr(self, field.name) for field in fields(self))
+
+
+# District to neighborhood mapping for enhanced matching
+DISTRICT_TO_NEIGHBORHOODS = {
+    'central': ['civic center', 'downtown', 'union square', 'tenderloin', 'soma', 'south of market', 'tendernob', 'south beach', 'yerba buena'],
+    'financial district': ['financial district', 'chinatown', 'nob hill', 'north beach', 'russian hill', 'telegraph hill'],
+    'marina': ['marina', 'pacific heights', 'cow hollow', 'presidio', 'presidio heights'],
+    'western addition': ['alamo square', 'anza vista', 'cathedral hill', 'fillmore', 'japantown', 'western addition', 'hayes valley'],
+    'haight': ['buena vista', 'castro', 'corona heights', 'duboce triangle', 'haight-ashbury', 'noe valley'],
+    'mission': ['mission', 'potrero hill', 'dogpatch', 'mission bay', 'mission dolores'],
+    'south central': ['bernal heights', 'diamond heights', 'glen park', 'twin peaks'],
+    'west of twin peaks': ['balboa terrace', 'forest hill', 'forest knolls', 'ingleside', 'ingleside terraces', 'miraloma park', 'monterey heights', 'mt. davidson manor', 'st. francis wood', 'sunnyside', 'westwood highlands', 'westwood park'],
+    'richmond': ['richmond', 'lake street', 'laurel heights', 'sea cliff'],
+    'sunset': ['sunset', 'parkside'],
+    'southeastern': ['bayview-hunters point', 'crocker-amazon', 'excelsior', 'little hollywood', 'mclaren park', 'oceanview', 'silver terrace', 'visitacion valley', 'hunters point', 'india basin']
+}
+
+# Intent extraction patterns
+INTENT_PATTERNS = {
+    # Cities and states
+    'city_state': [
+        r'\b(san francisco|sf|new york|nyc|los angeles|la|chicago|miami|seattle|boston|austin|denver|portland|atlanta|phoenix|las vegas|houston|dallas|philadelphia|washington dc|dc)\b',
+        r'\b(california|ca|new york|ny|texas|tx|florida|fl|illinois|il|washington|wa|massachusetts|ma|colorado|co|oregon|or|georgia|ga|arizona|az|nevada|nv|pennsylvania|pa|virginia|va)\b'
+    ],
+
+    # Enhanced neighborhoods with comprehensive SF neighborhoods and district aliases
+    'neighborhood': [
+        # Full neighborhood names (comprehensive list)
+        r'\b(civic center|downtown|union square|tenderloin|soma|south of market|chinatown|financial district|nob hill|north beach|russian hill|telegraph hill|cow hollow|marina|pacific heights|presidio|presidio heights|alamo square|anza vista|cathedral hill|fillmore|japantown|western addition|hayes valley|buena vista|castro|corona heights|duboce triangle|haight-ashbury|noe valley|mission|potrero hill|dogpatch|mission bay|mission dolores|bernal heights|diamond heights|glen park|twin peaks|balboa terrace|forest hill|forest knolls|ingleside|ingleside terraces|miraloma park|monterey heights|mt\. davidson manor|st\. francis wood|sunnyside|westwood highlands|westwood park|richmond|lake street|laurel heights|sea cliff|sunset|parkside|bayview-hunters point|crocker-amazon|excelsior|little hollywood|mclaren park|oceanview|silver terrace|visitacion valley|tendernob|south beach|yerba buena|hunters point|india basin)\b',
+        # District aliases and common variations
+        r'\b(marina district|pacific heights|nob hill|chinatown|financial|soma|tenderloin|downtown|union square|civic center|north beach|russian hill|telegraph hill|cow hollow|presidio|presidio heights|alamo square|anza vista|cathedral hill|fillmore district|japantown|western addition|buena vista|castro|corona heights|duboce triangle|haight|ashbury|noe valley|mission district|potrero hill|bernal heights|diamond heights|glen park|twin peaks|balboa terrace|forest hill|forest knolls|ingleside terraces|miraloma|monterey heights|st\. francis wood|sunnyside|westwood|richmond district|sunset district|bayview|hunters point|crocker|amazon|excelsior|little hollywood|mclaren|oceanview|silver terrace|visitacion)\b',
+        # District names
+        r'\b(central|financial district|marina|western addition|haight|mission district|south central|west of twin peaks|richmond district|sunset district|southeastern)\b'
+    ],
+
+    # Price ranges
+    'price_sale': [
+        r'\bunder\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)',
+        r'\bless than\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)',
+        r'\bmax\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)',
+        r'\bup to\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)'
+    ],
+    'price_rent': [
+        r'\brent\s+under\s+\$?([0-9,]+)\b',
+        r'\brental\s+max\s+\$?([0-9,]+)\b',
+        r'\bunder\s+\$?([0-9,]+)\s+per\s+month\b',
+        r'\bunder\s+\$?([0-9,]+)\s*/\s*month\b',
+        r'\bmax\s+\$?([0-9,]+)\s+per\s+month\b',
+        r'\bmax\s+\$?([0-9,]+)\s*/\s*month\b'
+    ],
+
+    # Bedrooms and bathrooms
+    'beds': [
+        r'\b([1-5])\s*(?:bed|bedroom|br)s?\b',
+        r'\b([1-5])\s*bed\b',
+        r'\b([1-5])-bedroom\b',
+        r'\b([1-5])-bed\b',
+        r'\b([1-5])\+\s*(?:bed|bedroom|br)s?\b',
+        r'\b([1-5])\+\s*bed\b'
+    ],
+    'baths': [
+        r'\b([1-4])\s*(?:bath|bathroom)s?\b',
+        r'\b([1-4])\s*bath\b',
+        r'\b([1-4])-bath\b',
+        r'\b([1-4])-bathroom\b'
+    ],
+
+    # Square footage
+    'sqft': [
+        r'\b(?:at least|minimum|with at least)\s+([0-9,]+)\s*(?:sq\s*ft|square\s*feet|square\s*foot)\b',
+        r'\b([0-9,]+)\s*(?:sq\s*ft|square\s*feet|square\s*foot)\s*(?:or more|minimum|at least)\b',
+        r'\b(?:minimum|at least)\s+([0-9,]+)\s*(?:sq\s*ft|square\s*feet|square\s*foot)\b',
+        r'\b([0-9,]+)\+\s*(?:sq\s*ft|square\s*feet|square\s*foot)\b'
+    ],
+
+    # Property features
+    'garage': [
+        r'\bgarage\b',
+        r'\bparking\b',
+        r'\bcar space\b'
+    ],
+    'property_type': [
+        r'\b(condo|apartment|apartments|house|houses|townhouse|townhouses|single family|multi family|duplex|duplexes|loft|lofts|studio|studios)\b'
+    ],
+
+    # Listing type (rent/sale)
+    'listing_type': [
+        r'\bfor\s+rent\b',
+        r'\brental\b',
+        r'\brenting\b',
+        r'\bto\s+rent\b',
+        r'\bfor\s+sale\b',
+        r'\bbuying\b',
+        r'\bto\s+buy\b',
+        r'\bpurchase\b'
+    ],
+
+    # Soft preferences
+    'good_schools': [
+        r'\bgood school\b',
+        r'\bexcellent school\b',
+        r'\bgreat school\b',
+        r'\bhigh rated school\b',
+        r'\bgood schools\b',
+        r'\bexcellent schools\b',
+        r'\bgreat schools\b',
+        r'\bhigh rated schools\b'
+    ],
+    'yard': [
+        r'\byard\b',
+        r'\bgarden\b',
+        r'\bbackyard\b',
+        r'\bfront yard\b',
+        r'\boutdoor space\b',
+        r'\bpatio\b',
+        r'\bdeck\b'
+    ],
+    'walk_to_metro': [
+        r'\bwalk to metro\b',
+        r'\bwalking distance to transit\b',
+        r'\bnear metro\b',
+        r'\bclose to subway\b',
+        r'\bwalk to train\b',
+        r'\bnear bart\b',
+        r'\bbart station\b',
+        r'\bclose to bart\b'
+    ],
+    'modern': [
+        r'\bmodern\b',
+        r'\bcontemporary\b',
+        r'\bnew\b',
+        r'\bupdated\b'
+    ],
+    'renovated': [
+        r'\brenovated\b',
+        r'\bremodeled\b',
+        r'\bupdated\b',
+        r'\bnewly renovated\b'
+    ],
+    'ocean_view': [
+        r'\bocean view\b',
+        r'\bwaterfront\b',
+        r'\bsea view\b',
+        r'\bwater view\b'
+    ],
+    'mountain_view': [
+        r'\bmountain view\b',
+        r'\bhills view\b',
+        r'\bscenic view\b'
+    ],
+    'quiet': [
+        r'\bquiet\b',
+        r'\bpeaceful\b',
+        r'\bcalm\b',
+        r'\bno noise\b'
+    ],
+    'family_friendly': [
+        r'\bfamily friendly\b',
+        r'\bkid friendly\b',
+        r'\bgood for family\b',
+        r'\bsafe neighborhood\b',
+        r'\bfamily house\b',
+        r'\bfamily home\b',
+        r'\bfamily property\b'
+    ],
+    'featured': [
+        r'\bfeatured\b',
+        r'\bpremium\b',
+        r'\bhighlighted\b',
+        r'\bspecial\b',
+        r'\bexclusive\b'
+    ],
+    'near_grocery': [
+        r'\bclose to grocery\b',
+        r'\bnear grocery\b',
+        r'\bwalking distance to grocery\b',
+        r'\bgrocery stores\b',
+        r'\bsupermarket\b'
+    ],
+    'near_shopping': [
+        r'\bclose to shopping\b',
+        r'\bnear shopping\b',
+        r'\bwalking distance to shopping\b',
+        r'\bshopping\b',
+        r'\bretail\b',
+        r'\bstores\b'
+    ],
+    'safe_area': [
+        r'\bsafe\s+areas?\b',
+        r'\bsafe\s+neighborhoods?\b',
+        r'\bsafe\s+communities?\b',
+        r'\bsecure\s+areas?\b',
+        r'\b(?:low|good)\s+crime\s+(?:areas?|neighborhoods?)\b'
+    ],
+    'walkable': [
+        r'\bwalk(?:ing)?\s+(?:distance|to|from)\b',
+        r'\bwalkable\b',
+        r'\b(?:near|close\s+to)\s+(?:restaurants?|cafes?|shops?|stores?)\b',
+        r'\b(?:restaurants?|cafes?|shops?|stores?)\s+(?:nearby|within\s+walking\s+distance)\b'
+    ],
+    'dining_options': [
+        r'\brestaurants?\b',
+        r'\bcafes?\b',
+        r'\bdining\s+options?\b',
+        r'\bfood\s+(?:options?|choices?)\b'
+    ],
+    'short_term_rental': [
+        r'\bshort\s*[-]?\s*term\s+rental\b',
+        r'\bshort\s*[-]?\s*term\s+lease\b',
+        r'\btemporary\s+rental\b',
+        r'\bmonth\s*to\s*month\b',
+        r'\bflexible\s+lease\b'
+    ],
+    'pet_friendly': [
+        r'\ballows?\s+pets?\b',
+        r'\bpet\s+friendly\b',
+        r'\bpets?\s+allowed\b',
+        r'\bpets?\s+welcome\b',
+        r'\bdog\s+friendly\b',
+        r'\bcat\s+friendly\b'
+    ]
+}
+
+# Compile every pattern once at import; extract_intent runs them on each query
+_COMPILED_PATTERNS = {
+    name: [re.compile(pattern) for pattern in patterns]
+    for name, patterns in INTENT_PATTERNS.items()
+}
+
+# Yes/no preferences only need to know whether any pattern matches, so
+# each list is folded into a single alternation scanned once per query
+_COMBINED_PATTERNS = {
+    name: re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+    for name, patterns in INTENT_PATTERNS.items()
+}
 
 
 class IntentExtractor:
     """Extract structured search intent from natural language queries"""
     
     def __init__(self):
-        # District to neighborhood mapping for enhanced matching
-        self.district_to_neighborhoods = {
-            'central': ['civic center', 'downtown', 'union square', 'tenderloin', 'soma', 'south of market', 'tendernob', 'south beach', 'yerba buena'],
-            'financial district': ['financial district', 'chinatown', 'nob hill', 'north beach', 'russian hill', 'telegraph hill'],
-            'marina': ['marina', 'pacific heights', 'cow hollow', 'presidio', 'presidio heights'],
-            'western addition': ['alamo square', 'anza vista', 'cathedral hill', 'fillmore', 'japantown', 'western addition', 'hayes valley'],
-            'haight': ['buena vista', 'castro', 'corona heights', 'duboce triangle', 'haight-ashbury', 'noe valley'],
-            'mission': ['mission', 'potrero hill', 'dogpatch', 'mission bay', 'mission dolores'],
-            'south central': ['bernal heights', 'diamond heights', 'glen park', 'twin peaks'],
-            'west of twin peaks': ['balboa terrace', 'forest hill', 'forest knolls', 'ingleside', 'ingleside terraces', 'miraloma park', 'monterey heights', 'mt. davidson manor', 'st. francis wood', 'sunnyside', 'westwood highlands', 'westwood park'],
-            'richmond': ['richmond', 'lake street', 'laurel heights', 'sea cliff'],
-            'sunset': ['sunset', 'parkside'],
-            'southeastern': ['bayview-hunters point', 'crocker-amazon', 'excelsior', 'little hollywood', 'mclaren park', 'oceanview', 'silver terrace', 'visitacion valley', 'hunters point', 'india basin']
-        }
+        # Pattern tables are shared, read-only module data built once at import
+        self.district_to_neighborhoods = DISTRICT_TO_NEIGHBORHOODS
+        self.intent_patterns = INTENT_PATTERNS
+        self.compiled_patterns = _COMPILED_PATTERNS
+        self.combined_patterns = _COMBINED_PATTERNS
         
-        # Intent extraction patterns
-        self.intent_patterns = {
-            # Cities and states
-            'city_state': [
-                r'\b(san francisco|sf|new york|nyc|los angeles|la|chicago|miami|seattle|boston|austin|denver|portland|atlanta|phoenix|las vegas|houston|dallas|philadelphia|washington dc|dc)\b',
-                r'\b(california|ca|new york|ny|texas|tx|florida|fl|illinois|il|washington|wa|massachusetts|ma|colorado|co|oregon|or|georgia|ga|arizona|az|nevada|nv|pennsylvania|pa|virginia|va)\b'
-            ],
-            
-            # Enhanced neighborhoods with comprehensive SF neighborhoods and district aliases
-            'neighborhood': [
-                # Full neighborhood names (comprehensive list)
-                r'\b(civic center|downtown|union square|tenderloin|soma|south of market|chinatown|financial district|nob hill|north beach|russian hill|telegraph hill|cow hollow|marina|pacific heights|presidio|presidio heights|alamo square|anza vista|cathedral hill|fillmore|japantown|western addition|hayes valley|buena vista|castro|corona heights|duboce triangle|haight-ashbury|noe valley|mission|potrero hill|dogpatch|mission bay|mission dolores|bernal heights|diamond heights|glen park|twin peaks|balboa terrace|forest hill|forest knolls|ingleside|ingleside terraces|miraloma park|monterey heights|mt\. davidson manor|st\. francis wood|sunnyside|westwood highlands|westwood park|richmond|lake street|laurel heights|sea cliff|sunset|parkside|bayview-hunters point|crocker-amazon|excelsior|little hollywood|mclaren park|oceanview|silver terrace|visitacion valley|tendernob|south beach|yerba buena|hunters point|india basin)\b',
-                # District aliases and common variations
-                r'\b(marina district|pacific heights|nob hill|chinatown|financial|soma|tenderloin|downtown|union square|civic center|north beach|russian hill|telegraph hill|cow hollow|presidio|presidio heights|alamo square|anza vista|cathedral hill|fillmore district|japantown|western addition|buena vista|castro|corona heights|duboce triangle|haight|ashbury|noe valley|mission district|potrero hill|bernal heights|diamond heights|glen park|twin peaks|balboa terrace|forest hill|forest knolls|ingleside terraces|miraloma|monterey heights|st\. francis wood|sunnyside|westwood|richmond district|sunset district|bayview|hunters point|crocker|amazon|excelsior|little hollywood|mclaren|oceanview|silver terrace|visitacion)\b',
-                # District names
-                r'\b(central|financial district|marina|western addition|haight|mission district|south central|west of twin peaks|richmond district|sunset district|southeastern)\b'
-            ],
-            
-            # Price ranges
-            'price_sale': [
-                r'\bunder\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)',
-                r'\bless than\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)',
-                r'\bmax\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)',
-                r'\bup to\s+\$?([0-9,]+(?:k|m)?)\b(?!\s+per\s+month|\s*/\s*month)'
-            ],
-            'price_rent': [
-                r'\brent\s+under\s+\$?([0-9,]+)\b',
-                r'\brental\s+max\s+\$?([0-9,]+)\b',
-                r'\bunder\s+\$?([0-9,]+)\s+per\s+month\b',
-                r'\bunder\s+\$?([0-9,]+)\s*/\s*month\b',
-                r'\bmax\s+\$?([0-9,]+)\s+per\s+month\b',
-                r'\bmax\s+\$?([0-9,]+)\s*/\s*month\b'
-            ],
-            
-            # Bedrooms and bathrooms
-            'beds': [
-                r'\b([1-5])\s*(?:bed|bedroom|br)s?\b',
-                r'\b([1-5])\s*bed\b',
-                r'\b([1-5])-bedroom\b',
-                r'\b([1-5])-bed\b',
-                r'\b([1-5])\+\s*(?:bed|bedroom|br)s?\b',
-                r'\b([1-5])\+\s*bed\b'
-            ],
-            'baths': [
-                r'\b([1-4])\s*(?:bath|bathroom)s?\b',
-                r'\b([1-4])\s*bath\b',
-                r'\b([1-4])-bath\b',
-                r'\b([1-4])-bathroom\b'
-            ],
-            
-            # Square footage
-            'sqft': [
-                r'\b(?:at least|minimum|with at least)\s+([0-9,]+)\s*(?:sq\s*ft|square\s*feet|square\s*foot)\b',
-                r'\b([0-9,]+)\s*(?:sq\s*ft|square\s*feet|square\s*foot)\s*(?:or more|minimum|at least)\b',
-                r'\b(?:minimum|at least)\s+([0-9,]+)\s*(?:sq\s*ft|square\s*feet|square\s*foot)\b',
-                r'\b([0-9,]+)\+\s*(?:sq\s*ft|square\s*feet|square\s*foot)\b'
-            ],
-            
-            # Property features
-            'garage': [
-                r'\bgarage\b',
-                r'\bparking\b',
-                r'\bcar space\b'
-            ],
-            'property_type': [
-                r'\b(condo|apartment|apartments|house|houses|townhouse|townhouses|single family|multi family|duplex|duplexes|loft|lofts|studio|studios)\b'
-            ],
-            
-            # Listing type (rent/sale)
-            'listing_type': [
-                r'\bfor\s+rent\b',
-                r'\brental\b',
-                r'\brenting\b',
-                r'\bto\s+rent\b',
-                r'\bfor\s+sale\b',
-                r'\bbuying\b',
-                r'\bto\s+buy\b',
-                r'\bpurchase\b'
-            ],
-            
-            # Soft preferences
-            'good_schools': [
-                r'\bgood school\b',
-                r'\bexcellent school\b',
-                r'\bgreat school\b',
-                r'\bhigh rated school\b',
-                r'\bgood schools\b',
-                r'\bexcellent schools\b',
-                r'\bgreat schools\b',
-                r'\bhigh rated schools\b'
-            ],
-            'yard': [
-                r'\byard\b',
-                r'\bgarden\b',
-                r'\bbackyard\b',
-                r'\bfront yard\b',
-                r'\boutdoor space\b',
-                r'\bpatio\b',
-                r'\bdeck\b'
-            ],
-            'walk_to_metro': [
-                r'\bwalk to metro\b',
-                r'\bwalking distance to transit\b',
-                r'\bnear metro\b',
-                r'\bclose to subway\b',
-                r'\bwalk to train\b',
-                r'\bnear bart\b',
-                r'\bbart station\b',
-                r'\bclose to bart\b'
-            ],
-            'modern': [
-                r'\bmodern\b',
-                r'\bcontemporary\b',
-                r'\bnew\b',
-                r'\bupdated\b'
-            ],
-            'renovated': [
-                r'\brenovated\b',
-                r'\bremodeled\b',
-                r'\bupdated\b',
-                r'\bnewly renovated\b'
-            ],
-            'ocean_view': [
-                r'\bocean view\b',
-                r'\bwaterfront\b',
-                r'\bsea view\b',
-                r'\bwater view\b'
-            ],
-            'mountain_view': [
-                r'\bmountain view\b',
-                r'\bhills view\b',
-                r'\bscenic view\b'
-            ],
-            'quiet': [
-                r'\bquiet\b',
-                r'\bpeaceful\b',
-                r'\bcalm\b',
-                r'\bno noise\b'
-            ],
-            'family_friendly': [
-                r'\bfamily friendly\b',
-                r'\bkid friendly\b',
-                r'\bgood for family\b',
-                r'\bsafe neighborhood\b',
-                r'\bfamily house\b',
-                r'\bfamily home\b',
-                r'\bfamily property\b'
-            ],
-            'featured': [
-                r'\bfeatured\b',
-                r'\bpremium\b',
-                r'\bhighlighted\b',
-                r'\bspecial\b',
-                r'\bexclusive\b'
-            ],
-            'near_grocery': [
-                r'\bclose to grocery\b',
-                r'\bnear grocery\b',
-                r'\bwalking distance to grocery\b',
-                r'\bgrocery stores\b',
-                r'\bsupermarket\b'
-            ],
-            'near_shopping': [
-                r'\bclose to shopping\b',
-                r'\bnear shopping\b',
-                r'\bwalking distance to shopping\b',
-                r'\bshopping\b',
-                r'\bretail\b',
-                r'\bstores\b'
-            ],
-            'safe_area': [
-                r'\bsafe\s+areas?\b',
-                r'\bsafe\s+neighborhoods?\b',
-                r'\bsafe\s+communities?\b',
-                r'\bsecure\s+areas?\b',
-                r'\b(?:low|good)\s+crime\s+(?:areas?|neighborhoods?)\b'
-            ],
-            'walkable': [
-                r'\bwalk(?:ing)?\s+(?:distance|to|from)\b',
-                r'\bwalkable\b',
-                r'\b(?:near|close\s+to)\s+(?:restaurants?|cafes?|shops?|stores?)\b',
-                r'\b(?:restaurants?|cafes?|shops?|stores?)\s+(?:nearby|within\s+walking\s+distance)\b'
-            ],
-            'dining_options': [
-                r'\brestaurants?\b',
-                r'\bcafes?\b',
-                r'\bdining\s+options?\b',
-                r'\bfood\s+(?:options?|choices?)\b'
-            ],
-            'short_term_rental': [
-                r'\bshort\s*[-]?\s*term\s+rental\b',
-                r'\bshort\s*[-]?\s*term\s+lease\b',
-                r'\btemporary\s+rental\b',
-                r'\bmonth\s*to\s*month\b',
-                r'\bflexible\s+lease\b'
-            ],
-            'pet_friendly': [
-                r'\ballows?\s+pets?\b',
-                r'\bpet\s+friendly\b',
-                r'\bpets?\s+allowed\b',
-                r'\bpets?\s+welcome\b',
-                r'\bdog\s+friendly\b',
-                r'\bcat\s+friendly\b'
-            ]
-        }
+        # Extraction is pure over the query text, so repeated queries are memoized
+        self._extract_intent_cached = functools.lru_cache(maxsize=4096)(self._extract_intent)
     
     def _normalize_neighborhood(self, neighborhood: str) -> str:
         """Normalize neighborhood name and handle district mappings"""
@@ -311,12 +340,17 @@ class IntentExtractor:
     
     def extract_intent(self, query: str) -> SearchIntent:
         """Extract structured search intent from natural language query"""
+        # Callers may adjust the intent (e.g. structured filters), so never share the cached one
+        return copy.copy(self._extract_intent_cached(query))
+    
+    def _extract_intent(self, query: str) -> SearchIntent:
+        """Run the intent patterns over query (uncached)"""
         query_lower = query.lower()
         intent = SearchIntent()
         
         # Extract city/state
-        for pattern in self.intent_patterns['city_state']:
-            matches = re.findall(pattern, query_lower)
+        for pattern in self.compiled_patterns['city_state']:
+            matches = pattern.findall(query_lower)
             if matches:
                 match = matches[0]
                 # Check if it's a state abbreviation
@@ -330,8 +364,8 @@ class IntentExtractor:
                     intent.city = match
         
         # Extract neighborhood with enhanced matching
-        for pattern in self.intent_patterns['neighborhood']:
-            matches = re.findall(pattern, query_lower)
+        for pattern in self.compiled_patterns['neighborhood']:
+            matches = pattern.findall(query_lower)
             if matches:
                 neighborhood = matches[0]
                 # Normalize the neighborhood name
@@ -341,8 +375,8 @@ class IntentExtractor:
                 break
         
         # Extract price ranges - check rent first to avoid conflicts
-        for pattern in self.intent_patterns['price_rent']:
-            matches = re.findall(pattern, query_lower)
+        for pattern in self.compiled_patterns['price_rent']:
+            matches = pattern.findall(query_lower)
             if matches:
                 intent.max_price_rent = float(matches[0].replace(',', ''))
                 logger.info(f"Extracted max_price_rent: {intent.max_price_rent}")
@@ -350,8 +384,8 @@ class IntentExtractor:
         
         # Only check sale patterns if no rent pattern matched
         if intent.max_price_rent is None:
-            for pattern in self.intent_patterns['price_sale']:
-                matches = re.findall(pattern, query_lower)
+            for pattern in self.compiled_patterns['price_sale']:
+                matches = pattern.findall(query_lower)
                 if matches:
                     price_str = matches[0].replace(',', '')
                     if 'k' in price_str:
@@ -363,28 +397,28 @@ class IntentExtractor:
                     break
         
         # Extract bedrooms/bathrooms
-        for pattern in self.intent_patterns['beds']:
-            matches = re.findall(pattern, query_lower)
+        for pattern in self.compiled_patterns['beds']:
+            matches = pattern.findall(query_lower)
             if matches:
                 intent.min_beds = int(matches[0])
         
-        for pattern in self.intent_patterns['baths']:
-            matches = re.findall(pattern, query_lower)
+        for pattern in self.compiled_patterns['baths']:
+            matches = pattern.findall(query_lower)
             if matches:
                 intent.min_baths = int(matches[0])
                 logger.info(f"Extracted min_baths: {intent.min_baths}")
         
         # Extract square footage
-        for pattern in self.intent_patterns['sqft']:
-            matches = re.findall(pattern, query_lower)
+        for pattern in self.compiled_patterns['sqft']:
+            matches = pattern.findall(query_lower)
             if matches:
                 intent.min_sqft = int(matches[0].replace(',', ''))
                 logger.info(f"Extracted min_sqft: {intent.min_sqft}")
                 break
         
         # Extract property type
-        for pattern in self.intent_patterns['property_type']:
-            matches = re.findall(pattern, query_lower)
+        for pattern in self.compiled_patterns['property_type']:
+            matches = pattern.findall(query_lower)
             if matches:
                 property_type = matches[0]
                 # Map plural forms to singular forms
@@ -402,35 +436,32 @@ class IntentExtractor:
                 break
         
         # Extract listing type (rent/sale)
-        for pattern in self.intent_patterns['listing_type']:
-            if re.search(pattern, query_lower):
-                if any(word in query_lower for word in ['for rent', 'rental', 'renting', 'to rent']):
-                    intent.listing_type = 'rent'
-                    logger.info(f"Extracted listing_type: {intent.listing_type}")
-                    break
-                elif any(word in query_lower for word in ['for sale', 'buying', 'to buy', 'purchase']):
-                    intent.listing_type = 'sale'
-                    logger.info(f"Extracted listing_type: {intent.listing_type}")
-                    break
+        if self.combined_patterns['listing_type'].search(query_lower):
+            if any(word in query_lower for word in ['for rent', 'rental', 'renting', 'to rent']):
+                intent.listing_type = 'rent'
+                logger.info(f"Extracted listing_type: {intent.listing_type}")
+            elif any(word in query_lower for word in ['for sale', 'buying', 'to buy', 'purchase']):
+                intent.listing_type = 'sale'
+                logger.info(f"Extracted listing_type: {intent.listing_type}")
         
         # Extract soft preferences
-        intent.garage_required = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['garage'])
-        intent.good_schools = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['good_schools'])
-        intent.yard = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['yard'])
-        intent.walk_to_metro = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['walk_to_metro'])
-        intent.modern = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['modern'])
-        intent.renovated = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['renovated'])
-        intent.ocean_view = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['ocean_view'])
-        intent.mountain_view = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['mountain_view'])
-        intent.quiet = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['quiet'])
-        intent.family_friendly = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['family_friendly'])
-        intent.featured = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['featured'])
-        intent.near_grocery = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['near_grocery'])
-        intent.near_shopping = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['near_shopping'])
-        intent.safe_area = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['safe_area'])
-        intent.walkable = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['walkable'])
-        intent.dining_options = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['dining_options'])
-        intent.short_term_rental = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['short_term_rental'])
-        intent.pet_friendly = any(re.search(pattern, query_lower) for pattern in self.intent_patterns['pet_friendly'])
+        intent.garage_required = self.combined_patterns['garage'].search(query_lower) is not None
+        intent.good_schools = self.combined_patterns['good_schools'].search(query_lower) is not None
+        intent.yard = self.combined_patterns['yard'].search(query_lower) is not None
+        intent.walk_to_metro = self.combined_patterns['walk_to_metro'].search(query_lower) is not None
+        intent.modern = self.combined_patterns['modern'].search(query_lower) is not None
+        intent.renovated = self.combined_patterns['renovated'].search(query_lower) is not None
+        intent.ocean_view = self.combined_patterns['ocean_view'].search(query_lower) is not None
+        intent.mountain_view = self.combined_patterns['mountain_view'].search(query_lower) is not None
+        intent.quiet = self.combined_patterns['quiet'].search(query_lower) is not None
+        intent.family_friendly = self.combined_patterns['family_friendly'].search(query_lower) is not None
+        intent.featured = self.combined_patterns['featured'].search(query_lower) is not None
+        intent.near_grocery = self.combined_patterns['near_grocery'].search(query_lower) is not None
+        intent.near_shopping = self.combined_patterns['near_shopping'].search(query_lower) is not None
+        intent.safe_area = self.combined_patterns['safe_area'].search(query_lower) is not None
+        intent.walkable = self.combined_patterns['walkable'].search(query_lower) is not None
+        intent.dining_options = self.combined_patterns['dining_options'].search(query_lower) is not None
+        intent.short_term_rental = self.combined_patterns['short_term_rental'].search(query_lower) is not None
+        intent.pet_friendly = self.combined_patterns['pet_friendly'].search(query_lower) is not None
         
         return intent
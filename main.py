@@ -4,8 +4,9 @@ A standalone FastAPI service for LLM-powered property search using RAG.
 """
 
 import os
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import Optional
 
 import asyncpg
@@ -19,7 +20,7 @@ from openai import AsyncOpenAI
 from search_engine import SearchEngine
 from models import SearchRequest, SearchResponse, ListingResult
 from database import DatabaseManager
-from config import Config
+from config import get_config
 
 # Load environment variables
 load_dotenv()
@@ -29,7 +30,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize configuration
-config = Config()
+config = get_config()
 
 # Global instances
 db_manager: Optional[DatabaseManager] = None
@@ -46,9 +47,25 @@ async def lifespan(app: FastAPI):
     logger.info("Starting DreamHeaven RAG API...")
     
     # Initialize database manager
-    db_manager = DatabaseManager(config.DATABASE_URL)
+    db_manager = DatabaseManager(
+        config.DATABASE_URL,
+        min_pool_size=config.DB_POOL_MIN_SIZE,
+        max_pool_size=config.DB_POOL_MAX_SIZE,
+        statement_cache_size=config.DB_STATEMENT_CACHE_SIZE
+    )
     await db_manager.initialize()
     
+    # Load the in-memory embedding matrix used by full-catalog searches
+    refresh_task = None
+    if config.EMBEDDING_MATRIX_REFRESH_SECONDS > 0:
+        try:
+            await db_manager.load_embedding_matrix()
+        except Exception as e:
+            logger.warning(f"Embedding matrix unavailable, full searches will use the database: {e}")
+        refresh_task = asyncio.create_task(
+            db_manager.refresh_embedding_matrix(config.EMBEDDING_MATRIX_REFRESH_SECONDS)
+        )
+    
     # Initialize search engine
     search_engine = SearchEngine(db_manager, openai_client)
     
@@ -57,6 +74,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down DreamHeaven RAG API...")
+    if refresh_task:
+        refresh_task.cancel()
+        # Let an in-flight refresh unwind before the pool it is using closes
+        with suppress(asyncio.CancelledError):
+            await refresh_task
     if db_manager:
         await db_manager.close()
     logger.info("DreamHeaven RAG API shutdown complete")
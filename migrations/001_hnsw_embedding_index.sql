@@ -0,0 +1,17 @@
+-- Half-precision copy of the listing embeddings, with the HNSW index for
+-- cosine-distance kNN that serves DatabaseManager.vector_search
+-- (ORDER BY embedding_hv <=> $n::halfvec LIMIT k). Requires pgvector 0.7+.
+-- Cosine ranking on fp16 is within rounding of fp32 for retrieval, while the
+-- column and its index are half the size. Being a generated column, it stays
+-- in sync with `embedding` as the ETL pipeline writes new embeddings.
+--
+-- Adding a STORED generated column rewrites listings_v2 under an ACCESS
+-- EXCLUSIVE lock, blocking reads and writes for the duration; run it in a
+-- maintenance window. Apply this migration before deploying code that ranks
+-- on embedding_hv (until then search falls back to the `embedding` column).
+ALTER TABLE listings_v2
+    ADD COLUMN IF NOT EXISTS embedding_hv halfvec(1536)
+    GENERATED ALWAYS AS (embedding::halfvec(1536)) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_embedding_hv_hnsw_idx
+    ON listings_v2 USING hnsw (embedding_hv halfvec_cosine_ops);
@@ -0,0 +1,21 @@
+-- Indexes for the structured filters built by SearchEngine._build_filter_conditions.
+-- Text filters compare LOWER(column) with lowercased parameters, so they need
+-- expression indexes; a plain index on the column would not be used.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_lower_city_idx
+    ON listings_v2 (LOWER(city));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_lower_state_idx
+    ON listings_v2 (LOWER(state));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_lower_property_type_idx
+    ON listings_v2 (LOWER(property_type));
+
+-- Numeric range filters and listing type
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_bedrooms_idx
+    ON listings_v2 (bedrooms);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_bathrooms_idx
+    ON listings_v2 (bathrooms);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_price_for_sale_idx
+    ON listings_v2 (price_for_sale);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_price_per_month_idx
+    ON listings_v2 (price_per_month);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS listings_v2_property_listing_type_idx
+    ON listings_v2 (property_listing_type);
@@ -3,10 +3,54 @@ Scoring engine module for DreamHeaven RAG API
 """
 
 import logging
+import math
 from typing import Dict, Any, Optional, List
 
+import numpy as np
+
+from cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# Keyword lists shared by the per-listing and batch soft preference scoring
+MODERN_TITLE_WORDS = ('modern', 'contemporary', 'new', 'updated')
+WATER_AREAS = ('marina', 'pacific heights', 'presidio', 'richmond', 'sunset')
+QUIET_AREAS = ('pacific heights', 'presidio heights', 'russian hill', 'marina')
+
+
+def _as_float(value: Any) -> float:
+    """Convert a listing value to float, using NaN for missing or non-numeric values"""
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _numeric_column(listings: List[Dict[str, Any]], key: str) -> np.ndarray:
+    """Extract a numeric column; NaN never satisfies a comparison, like the `is not None` checks"""
+    return np.fromiter((_as_float(listing.get(key)) for listing in listings), dtype=np.float64, count=len(listings))
+
+
+def _truthy_column(listings: List[Dict[str, Any]], key: str) -> np.ndarray:
+    """Extract a boolean column using Python truthiness"""
+    return np.fromiter((bool(listing.get(key)) for listing in listings), dtype=bool, count=len(listings))
+
+
+def _lower_column(listings: List[Dict[str, Any]], key: str) -> List[str]:
+    """Extract a lowercased string column, with missing values as empty strings"""
+    return [str(value).lower() if (value := listing.get(key)) is not None else '' for listing in listings]
+
+
+def _contains_any_mask(values: List[str], keywords) -> np.ndarray:
+    """Boolean mask of values containing any of the keywords"""
+    return np.fromiter((any(word in value for word in keywords) for value in values), dtype=bool, count=len(values))
+
+
+def _has_pet_amenity(amenities: Any) -> bool:
+    return isinstance(amenities, list) and any('pet' in amenity.lower() for amenity in amenities)
+
 
 class ScoringEngine:
     """Calculate scores for property listings based on search intent"""
@@ -26,6 +70,16 @@ class ScoringEngine:
             'listing_type': 0.08,     # listing_type (rent/sale)
             'renovated': 0.05         # renovated
         }
+        
+        # Detailed matches per (listing id, listing updated_at, intent); bump the
+        # version to drop every entry after listings change out of band
+        self.detailed_matches_cache = TTLCache(max_entries=10000, ttl_seconds=900)
+        self.detailed_matches_version = 0
+    
+    def invalidate_detailed_matches(self):
+        """Invalidate all cached detailed matches"""
+        self.detailed_matches_version += 1
+        self.detailed_matches_cache.clear()
     
     def calculate_score(self, listing: Dict[str, Any], intent) -> float:
         """Calculate final score for a listing"""
@@ -67,7 +121,7 @@ class ScoringEngine:
                 similarity_score = float(similarity_score)
             
             # Calculate detailed matches
-            matches = self._calculate_detailed_matches(listing, intent)
+            matches = self._get_detailed_matches(listing, intent)
             
             # Calculate match percentage for structured criteria
             match_percent, _, _ = self._calculate_match_percent(listing, intent)
@@ -100,6 +154,151 @@ class ScoringEngine:
                 'matches': {'structured': [], 'semantic': [], 'soft_preferences': [], 'missing': []}
             }
     
+    def calculate_scores_batch(self, listings: List[Dict[str, Any]], intent) -> np.ndarray:
+        """Calculate final scores for a batch of listings in one vectorized pass
+        
+        Produces the same scores as calculate_score, but evaluates each criterion
+        as a mask over column arrays instead of walking the listings one by one.
+        """
+        if not listings:
+            return np.zeros(0, dtype=np.float64)
+        
+        similarity_scores = np.nan_to_num(_numeric_column(listings, 'similarity_score'), nan=0.0)
+        match_percent = self._calculate_match_percent_batch(listings, intent)
+        soft_preference_bonus = self._calculate_soft_preference_bonus_batch(listings, intent)
+        
+        # Final score: 50% matches + 40% semantic + 10% preference
+        final_scores = (
+            0.5 * match_percent +
+            0.4 * similarity_scores +
+            0.1 * soft_preference_bonus
+        )
+        
+        return np.minimum(final_scores, 1.0)  # Cap at 1.0
+    
+    def _calculate_match_percent_batch(self, listings: List[Dict[str, Any]], intent) -> np.ndarray:
+        """Vectorized counterpart of _calculate_match_percent"""
+        weights = self.criteria_weights
+        total_weight = 0.0
+        weighted_score = np.zeros(len(listings), dtype=np.float64)
+        
+        if intent.max_price_sale:
+            total_weight += weights['budget_sale']
+            weighted_score += weights['budget_sale'] * (_numeric_column(listings, 'price_for_sale') <= intent.max_price_sale)
+        
+        if intent.max_price_rent:
+            total_weight += weights['budget_rent']
+            weighted_score += weights['budget_rent'] * (_numeric_column(listings, 'price_per_month') <= intent.max_price_rent)
+        
+        if intent.min_beds:
+            total_weight += weights['bedrooms']
+            weighted_score += weights['bedrooms'] * (_numeric_column(listings, 'bedrooms') >= intent.min_beds)
+        
+        if intent.min_baths:
+            total_weight += weights['bathrooms']
+            weighted_score += weights['bathrooms'] * (_numeric_column(listings, 'bathrooms') >= intent.min_baths)
+        
+        if intent.min_sqft:
+            total_weight += weights['square_feet']
+            weighted_score += weights['square_feet'] * (_numeric_column(listings, 'square_feet') >= intent.min_sqft)
+        
+        # Location matches if any of city, state or neighborhood matches
+        if intent.city or intent.state or intent.neighborhood:
+            total_weight += weights['location']
+            location_matched = np.zeros(len(listings), dtype=bool)
+            if intent.city:
+                location_matched |= np.array(_lower_column(listings, 'city')) == intent.city.lower()
+            if intent.state:
+                location_matched |= np.array(_lower_column(listings, 'state')) == intent.state.lower()
+            if intent.neighborhood:
+                location_matched |= np.array(_lower_column(listings, 'neighborhood')) == intent.neighborhood.lower()
+            weighted_score += weights['location'] * location_matched
+        
+        if intent.garage_required:
+            total_weight += weights['garage']
+            has_garage = (_numeric_column(listings, 'garage_number') > 0) | _truthy_column(listings, 'has_parking_lot')
+            weighted_score += weights['garage'] * has_garage
+        
+        if intent.walk_to_metro:
+            total_weight += weights['metro']
+            weighted_score += weights['metro'] * (_numeric_column(listings, 'shopping_idx') >= 7)
+        
+        if intent.property_type:
+            total_weight += weights['property_type']
+            wanted_type = intent.property_type.lower()
+            type_matched = np.fromiter(
+                (wanted_type in listing_type or listing_type in wanted_type
+                 for listing_type in _lower_column(listings, 'property_type')),
+                dtype=bool, count=len(listings)
+            )
+            weighted_score += weights['property_type'] * type_matched
+        
+        if intent.listing_type:
+            total_weight += weights['listing_type']
+            listing_types = np.array(_lower_column(listings, 'property_listing_type'))
+            weighted_score += weights['listing_type'] * (listing_types == intent.listing_type.lower())
+        
+        if intent.renovated:
+            renovated_weight = 0.05
+            total_weight += renovated_weight
+            weighted_score += renovated_weight * (_numeric_column(listings, 'year_renovated') >= 2020)
+        
+        if total_weight > 0:
+            return weighted_score / total_weight
+        return np.zeros(len(listings), dtype=np.float64)
+    
+    def _calculate_soft_preference_bonus_batch(self, listings: List[Dict[str, Any]], intent) -> np.ndarray:
+        """Vectorized counterpart of _calculate_soft_preference_bonus"""
+        bonus = np.zeros(len(listings), dtype=np.float64)
+        low_crime = None
+        
+        if intent.good_schools:
+            bonus += 0.08 * (_numeric_column(listings, 'school_rating') >= 8)
+        
+        if intent.safe_area or intent.quiet:
+            low_crime = _numeric_column(listings, 'crime_index') <= 3
+        
+        if intent.safe_area:
+            bonus += 0.06 * low_crime
+        
+        if intent.walkable:
+            bonus += 0.05 * (_numeric_column(listings, 'shopping_idx') >= 7)
+        
+        if intent.featured:
+            bonus += 0.06 * _truthy_column(listings, 'is_featured')
+        
+        if intent.yard:
+            bonus += 0.05 * _truthy_column(listings, 'has_yard')
+        
+        if intent.near_grocery:
+            bonus += 0.05 * (_numeric_column(listings, 'grocery_idx') >= 7)
+        
+        if intent.modern:
+            bonus += 0.04 * _contains_any_mask(_lower_column(listings, 'title'), MODERN_TITLE_WORDS)
+        
+        addresses = None
+        if intent.ocean_view or intent.quiet:
+            addresses = _lower_column(listings, 'address')
+        
+        if intent.ocean_view:
+            bonus += 0.07 * _contains_any_mask(addresses, WATER_AREAS)
+        
+        if intent.quiet:
+            # Low crime is the proxy for quietness, falling back to residential areas
+            bonus += 0.03 * (low_crime | _contains_any_mask(addresses, QUIET_AREAS))
+        
+        if intent.pet_friendly:
+            bonus += 0.08 * np.fromiter(
+                (_has_pet_amenity(listing.get('amenities', [])) for listing in listings),
+                dtype=bool, count=len(listings)
+            )
+        
+        if intent.short_term_rental:
+            listing_types = np.array(_lower_column(listings, 'property_listing_type'))
+            bonus += 0.06 * np.isin(listing_types, ('rent', 'both'))
+        
+        return np.minimum(bonus, 0.5)  # Cap bonus at 0.5
+    
     def _calculate_match_percent(self, listing: Dict[str, Any], intent) -> tuple:
         """Calculate match percentage for structured criteria"""
         matched_criteria = []
@@ -162,19 +361,19 @@ class ScoringEngine:
             
             # Check city match
             if intent.city:
-                listing_city = listing.get('city', '').lower()
+                listing_city = (listing.get('city') or '').lower()
                 if listing_city == intent.city.lower():
                     location_matched = True
             
             # Check state match
             if intent.state:
-                listing_state = listing.get('state', '').lower()
+                listing_state = (listing.get('state') or '').lower()
                 if listing_state == intent.state.lower():
                     location_matched = True
             
             # Check neighborhood match
             if intent.neighborhood:
-                listing_neighborhood = listing.get('neighborhood', '').lower()
+                listing_neighborhood = (listing.get('neighborhood') or '').lower()
                 if listing_neighborhood == intent.neighborhood.lower():
                     location_matched = True
             
@@ -233,7 +432,7 @@ class ScoringEngine:
         # Listing type matching (rent/sale)
         if intent.listing_type:
             total_weight += self.criteria_weights['listing_type']
-            listing_property_type = listing.get('property_listing_type', '').lower()
+            listing_property_type = (listing.get('property_listing_type') or '').lower()
             if listing_property_type and intent.listing_type.lower() == listing_property_type:
                 matched_criteria.append('listing_type')
                 weighted_score += self.criteria_weights['listing_type']
@@ -284,15 +483,14 @@ class ScoringEngine:
             title = listing.get('title')
             if title:
                 title_lower = title.lower()
-                if any(word in title_lower for word in ['modern', 'contemporary', 'new', 'updated']):
+                if any(word in title_lower for word in MODERN_TITLE_WORDS):
                     bonus += 0.04
         if intent.ocean_view:
             # Check if in water-adjacent areas
-            water_areas = ['marina', 'pacific heights', 'presidio', 'richmond', 'sunset']
             address = listing.get('address')
             if address:
                 address_lower = address.lower()
-                if any(area in address_lower for area in water_areas):
+                if any(area in address_lower for area in WATER_AREAS):
                     bonus += 0.07
         if intent.quiet:
             # Use crime_index as proxy for quietness
@@ -301,27 +499,38 @@ class ScoringEngine:
                 bonus += 0.03
             else:
                 # Fallback: assume quiet if in residential areas
-                quiet_areas = ['pacific heights', 'presidio heights', 'russian hill', 'marina']
                 address = listing.get('address')
                 if address:
                     address_lower = address.lower()
-                    if any(area in address_lower for area in quiet_areas):
+                    if any(area in address_lower for area in QUIET_AREAS):
                         bonus += 0.03
         
         # Check for pet-friendly in amenities
         if intent.pet_friendly:
-            amenities = listing.get('amenities', [])
-            if isinstance(amenities, list) and any('pet' in amenity.lower() for amenity in amenities):
+            if _has_pet_amenity(listing.get('amenities', [])):
                 bonus += 0.08
         
         # Check for short-term rental
         if intent.short_term_rental:
-            property_type = listing.get('property_listing_type', '').lower()
+            property_type = (listing.get('property_listing_type') or '').lower()
             if property_type in ['rent', 'both']:
                 bonus += 0.06
         
         return min(bonus, 0.5)  # Cap bonus at 0.5
     
+    def _get_detailed_matches(self, listing: Dict[str, Any], intent) -> Dict[str, List[str]]:
+        """Detailed match information, cached across searches (the result must not be mutated)"""
+        listing_id = listing.get('id')
+        if listing_id is None:
+            return self._calculate_detailed_matches(listing, intent)
+        
+        key = (listing_id, listing.get('updated_at'), self.detailed_matches_version, intent.signature())
+        matches = self.detailed_matches_cache.get(key)
+        if matches is None:
+            matches = self._calculate_detailed_matches(listing, intent)
+            self.detailed_matches_cache.set(key, matches)
+        return matches
+    
     def _calculate_detailed_matches(self, listing: Dict[str, Any], intent) -> Dict[str, List[str]]:
         """Calculate detailed match information"""
         matches = {
@@ -431,7 +640,7 @@ class ScoringEngine:
         
         # Check listing type (rent/sale)
         if intent.listing_type:
-            listing_property_type = listing.get('property_listing_type', '').lower()
+            listing_property_type = (listing.get('property_listing_type') or '').lower()
             if listing_property_type and intent.listing_type.lower() == listing_property_type:
                 matches['structured'].append(f"✓ {intent.listing_type.title()} property")
             else:
@@ -439,8 +648,8 @@ class ScoringEngine:
         
         # Check renovated/modern features
         if intent.renovated or intent.modern:
-            title = listing.get('title', '').lower()
-            description = listing.get('description', '').lower()
+            title = (listing.get('title') or '').lower()
+            description = (listing.get('description') or '').lower()
             if any(word in title for word in ['modern', 'updated', 'renovated', 'new']) or \
                any(word in description for word in ['modern', 'updated', 'renovated', 'new', 'recently']):
                 matches['structured'].append("✓ Modern/renovated features")
@@ -478,13 +687,13 @@ class ScoringEngine:
         matches = []
         
         # Check title matches
-        title = listing.get('title', '').lower()
+        title = (listing.get('title') or '').lower()
         
         # Check description matches
-        description = listing.get('description', '').lower()
+        description = (listing.get('description') or '').lower()
         
         # Check location matches in text content (only show if intent specifies location)
-        address = listing.get('address', '').lower()
+        address = (listing.get('address') or '').lower()
         city = listing.get('city', '')
         state = listing.get('state', '')
         
@@ -538,13 +747,13 @@ class ScoringEngine:
             matches.append(f"✓ Near grocery stores (accessibility: {grocery_idx}/10)")
         
         if intent.modern:
-            title = listing.get('title', '').lower()
+            title = (listing.get('title') or '').lower()
             if any(word in title for word in ['modern', 'contemporary', 'new', 'updated']):
                 matches.append("✓ Modern design/features")
         
         if intent.ocean_view:
             water_areas = ['marina', 'pacific heights', 'presidio', 'richmond', 'sunset']
-            address = listing.get('address', '').lower()
+            address = (listing.get('address') or '').lower()
             if any(area in address for area in water_areas):
                 matches.append("✓ Ocean view area")
         
@@ -554,7 +763,7 @@ class ScoringEngine:
                 matches.append(f"✓ Quiet neighborhood (crime index: {crime_index}/10)")
             else:
                 quiet_areas = ['pacific heights', 'presidio heights', 'russian hill', 'marina']
-                address = listing.get('address', '').lower()
+                address = (listing.get('address') or '').lower()
                 if any(area in address for area in quiet_areas):
                     matches.append("✓ Quiet residential area")
         
@@ -566,28 +775,28 @@ class ScoringEngine:
         
         # Check for short-term rental
         if intent.short_term_rental:
-            property_type = listing.get('property_listing_type', '').lower()
+            property_type = (listing.get('property_listing_type') or '').lower()
             if property_type in ['rent', 'both']:
                 matches.append("✓ Short-term rental available")
         
         # Check for mountain view
         if intent.mountain_view:
             mountain_areas = ['twin peaks', 'diamond heights', 'bernal heights', 'glen park']
-            address = listing.get('address', '').lower()
+            address = (listing.get('address') or '').lower()
             if any(area in address for area in mountain_areas):
                 matches.append("✓ Mountain view area")
         
         # Check for dining options
         if intent.dining_options:
             dining_indicators = ['restaurant', 'cafe', 'dining', 'food']
-            description = listing.get('description', '').lower()
+            description = (listing.get('description') or '').lower()
             if any(indicator in description for indicator in dining_indicators):
                 matches.append("✓ Dining options nearby")
         
         # Check for walk to metro (separate from walkable)
         if intent.walk_to_metro:
             transit_indicators = ['metro', 'bart', 'subway', 'transit', 'train']
-            description = listing.get('description', '').lower()
+            description = (listing.get('description') or '').lower()
             if any(indicator in description for indicator in transit_indicators):
                 matches.append("✓ Walk to metro/transit")
         
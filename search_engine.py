@@ -2,17 +2,25 @@
 Search engine module for DreamHeaven RAG API
 """
 
+import functools
 import logging
 import re
-import json
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
+
+import numpy as np
 from openai import AsyncOpenAI
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    from json import loads as _json_loads
+
 from models import SearchRequest, SearchResponse, ListingResult
 from database import DatabaseManager
 from intent_extractor import IntentExtractor
 from scoring import ScoringEngine
+from cache import EmbeddingCache, SemanticResultCache, TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +28,120 @@ logger = logging.getLogger(__name__)
 from intent_extractor import SearchIntent
 
 
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _lower(value: str) -> str:
+    return value.lower()
+
+
+# ListingResult fields copied from the listing row as-is
+_LISTING_FIELDS = (
+    'title', 'address', 'bedrooms', 'bathrooms', 'square_feet', 'garage_number',
+    'price', 'city', 'state', 'country', 'neighborhood', 'description', 'amenities',
+    'is_available', 'is_featured', 'latitude', 'longitude', 'rating', 'review_count',
+    'property_listing_type', 'year_built', 'year_renovated',
+)
+
+
+def _parse_images(images_data: Any) -> List[Any]:
+    """Normalize the images column, which may arrive as a list or a JSON string"""
+    if isinstance(images_data, list):
+        return images_data
+    if isinstance(images_data, str):
+        try:
+            return _json_loads(images_data)
+        except ValueError:  # also covers orjson.JSONDecodeError
+            return []
+    return []
+
+
+def _is_well_formed(listing: Dict[str, Any]) -> bool:
+    """Check the fields scoring cannot coerce: an id, and amenities as a list of strings"""
+    if listing.get('id') is None:
+        return False
+    amenities = listing.get('amenities')
+    return not isinstance(amenities, list) or all(isinstance(amenity, str) for amenity in amenities)
+
+
+def _format_reason(score_details: Dict[str, Any]) -> str:
+    """Generate a detailed reason for the match from its score details"""
+    matches = score_details['matches']
+    
+    reason_parts = []
+    
+    # Structured matches
+    if matches['structured']:
+        reason_parts.append("Matches your requirements: " + ", ".join(matches['structured']))
+    
+    # Semantic matches
+    if matches['semantic']:
+        reason_parts.append("Semantic matches: " + ", ".join(matches['semantic']))
+    
+    # Soft preferences
+    if matches['soft_preferences']:
+        reason_parts.append("Bonus features: " + ", ".join(matches['soft_preferences']))
+    
+    # Missing requirements (show if there are any, but limit to 2)
+    if matches['missing']:
+        reason_parts.append("Note: " + ", ".join(matches['missing'][:2]))  # Limit to 2 missing items
+    
+    if reason_parts:
+        return " | ".join(reason_parts)
+    else:
+        return "Recommended based on semantic similarity"
+
+
+# "What You Need" lines: (intent field, template formatted with the field value)
+_MUST_HAVE_SPEC = [
+    ('city', 'in {}'),
+    ('state', 'in {}'),
+    ('neighborhood', 'in {}'),
+    ('max_price_sale', 'under ${:,.0f}'),
+    ('max_price_rent', 'under ${:,.0f}/month'),
+    ('min_beds', 'at least {} bedroom(s)'),
+    ('min_baths', 'at least {} bathroom(s)'),
+    ('min_sqft', 'at least {} sq ft'),
+    ('garage_required', 'with parking/garage'),
+    ('property_type', 'preferably a {}'),
+]
+
+_NICE_TO_HAVE_SPEC = [
+    ('good_schools', 'good schools nearby'),
+    ('yard', 'with yard/garden'),
+    ('family_friendly', 'family-friendly'),
+    ('walk_to_metro', 'near public transit'),
+    ('modern', 'modern/contemporary'),
+    ('renovated', 'recently renovated'),
+    ('ocean_view', 'ocean view'),
+    ('mountain_view', 'mountain view'),
+    ('quiet', 'quiet neighborhood'),
+    ('featured', 'featured/premium'),
+    ('near_grocery', 'near grocery stores'),
+    ('near_shopping', 'near shopping'),
+    ('safe_area', 'safe area'),
+    ('walkable', 'walkable neighborhood'),
+    ('dining_options', 'dining options nearby'),
+    ('short_term_rental', 'short-term rental'),
+    ('pet_friendly', 'pet-friendly'),
+]
+
+
+# Optional structured filters: (intent field, SQL condition, parameter conversion).
+# Conditions with a conversion take one positional parameter, numbered via {}.
+_FILTER_FIELDS = [
+    ('city', 'LOWER(city) = ${}', _lower),
+    ('state', 'LOWER(state) = ${}', _lower),
+    ('max_price_sale', 'price_for_sale <= ${}', _identity),
+    ('max_price_rent', 'price_per_month <= ${}', _identity),
+    ('min_beds', 'bedrooms >= ${}', _identity),
+    ('min_baths', 'bathrooms >= ${}', _identity),
+    ('garage_required', '(garage_number > 0 OR has_parking_lot = true)', None),
+    ('property_type', 'LOWER(property_type) = ${}', _lower),
+]
+
+
 class SearchEngine:
     """Main search engine for property recommendations"""
     
@@ -28,6 +150,13 @@ class SearchEngine:
         self.openai_client = openai_client
         self.intent_extractor = IntentExtractor()
         self.scoring_engine = ScoringEngine()
+        self.embedding_cache = EmbeddingCache()
+        self.result_cache = SemanticResultCache()
+        self.exact_result_cache = TTLCache(max_entries=10000, ttl_seconds=300.0)
+        self._stmt_cache: Dict[int, str] = {}
+        
+        # Per-instance cache for the pure, per-signature text pipeline
+        self._what_you_need_cached = functools.lru_cache(maxsize=4096)(self._what_you_need_for_signature)
     
     async def search(
         self, 
@@ -39,16 +168,29 @@ class SearchEngine:
     ) -> SearchResponse:
         """Main search method"""
         try:
-            logger.info(f"Processing search query: {query}")
+            logger.info("Processing search query: %s", query)
+            
+            # Step 0: Serve exact repeats (ignoring case and surrounding whitespace) before any other work
+            exact_key = (
+                query.strip().lower(),
+                limit,
+                generate_reasons,
+                tuple(sorted(structured_filters.items())) if structured_filters else None
+            )
+            cached_response = self.exact_result_cache.get(exact_key)
+            if cached_response is not None:
+                logger.info("Serving search from exact result cache")
+                return cached_response.model_copy(update={'query': query})
             
             # Step 1: Extract search intent
             try:
+                # extract_intent returns a fresh copy, so structured filters may mutate it
                 intent = self.intent_extractor.extract_intent(query)
-                logger.info(f"Intent extracted: property_type={intent.property_type}, min_beds={intent.min_beds}")
+                logger.info("Intent extracted: property_type=%s, min_beds=%s", intent.property_type, intent.min_beds)
             except Exception as e:
-                logger.error(f"Error extracting intent: {e}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Error args: {e.args}")
+                logger.error("Error extracting intent: %s", e)
+                logger.error("Error type: %s", type(e).__name__)
+                logger.error("Error args: %s", e.args)
                 raise Exception(f"Intent extraction failed: {str(e)}")
             
             # Step 2: Apply structured filters if provided
@@ -56,53 +198,69 @@ class SearchEngine:
                 intent = self._apply_structured_filters(intent, structured_filters)
             
             # Step 3: Generate "What You Need" description
-            what_you_need = self._generate_what_you_need(intent)
+            what_you_need = self._what_you_need_cached(intent.signature())
+            
+            # Step 4: Reuse the response of an equivalent, semantically near-identical query
+            query_embedding = await self.get_embedding(query)
+            cache_key = (intent.signature(), limit, generate_reasons)
+            cached_response = self.result_cache.get(cache_key, query_embedding)
+            if cached_response is not None:
+                logger.info("Serving search from semantic result cache")
+                return cached_response.model_copy(update={'query': query})
             
-            # Step 4: Perform search
-            results, used_fallback = await self._perform_search(query, intent, limit)
+            # Step 5: Perform search (reasons are attached while scoring, if requested)
+            results, used_fallback = await self._perform_search(
+                query, intent, limit, generate_reasons, query_embedding=query_embedding
+            )
             
             # Add fallback information if used
             if used_fallback:
                 what_you_need += "\n\nNote: No exact matches found with your specific criteria, so we expanded the search to find the most relevant properties available."
             
-            # Step 5: Handle empty results
+            # Step 6: Handle empty results
             if not results:
-                return self._create_empty_response(query, limit, what_you_need)
-            
-            # Step 6: Generate reasons if requested
-            if generate_reasons:
-                await self._generate_reasons(query, results, intent)
-            
-            # Step 7: Convert to API response format
-            items = self._convert_to_listing_results(results)
-            
-            logger.info(f"Search completed with {len(items)} results")
+                response = self._create_empty_response(query, limit, what_you_need)
+            else:
+                # Step 7: Convert to API response format
+                items = self._convert_to_listing_results(results)
+                
+                logger.info("Search completed with %d results", len(items))
+                
+                response = SearchResponse(
+                    items=items,
+                    query=query,
+                    page=1,
+                    limit=limit,
+                    has_more=len(items) == limit,
+                    generation_error=False,
+                    what_you_need=what_you_need
+                )
             
-            return SearchResponse(
-                items=items,
-                query=query,
-                page=1,
-                limit=limit,
-                has_more=len(items) == limit,
-                generation_error=False,
-                what_you_need=what_you_need
-            )
+            self.result_cache.store(cache_key, query_embedding, response)
+            self.exact_result_cache.set(exact_key, response)
+            return response
             
         except Exception as e:
-            logger.error(f"Search failed: {e}")
+            logger.error("Search failed: %s", e)
             raise
     
     async def get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using OpenAI"""
+        """Get embedding for text using OpenAI, reusing cached embeddings for repeated queries"""
+        cached_embedding = self.embedding_cache.get(text)
+        if cached_embedding is not None:
+            return cached_embedding
+        
         try:
             response = await self.openai_client.embeddings.create(
                 model="text-embedding-3-small",
                 input=text,
                 encoding_format="float"
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+            self.embedding_cache.store(text, embedding)
+            return embedding
         except Exception as e:
-            logger.error(f"Failed to get embedding: {e}")
+            logger.error("Failed to get embedding: %s", e)
             raise
     
     def _apply_structured_filters(self, intent: SearchIntent, filters: Dict[str, Any]) -> SearchIntent:
@@ -122,305 +280,179 @@ class SearchEngine:
         
         return intent
     
+    def _what_you_need_for_signature(self, signature: Tuple[Any, ...]) -> str:
+        """Generate the "What You Need" description from an intent signature (cacheable)"""
+        return self._generate_what_you_need(SearchIntent(*signature))
+    
     def _generate_what_you_need(self, intent: SearchIntent) -> str:
         """Generate enhanced user-friendly description of requirements with must-have vs nice-to-have separation"""
-        must_have = []
-        nice_to_have = []
-        
         # Hard Filters (Must Have)
-        if intent.city:
-            must_have.append(f"in {intent.city}")
-        if intent.state:
-            must_have.append(f"in {intent.state}")
-        if intent.neighborhood:
-            must_have.append(f"in {intent.neighborhood}")
-        if intent.max_price_sale:
-            must_have.append(f"under ${intent.max_price_sale:,.0f}")
-        if intent.max_price_rent:
-            must_have.append(f"under ${intent.max_price_rent:,.0f}/month")
-        if intent.min_beds:
-            must_have.append(f"at least {intent.min_beds} bedroom(s)")
-        if intent.min_baths:
-            must_have.append(f"at least {intent.min_baths} bathroom(s)")
-        if intent.min_sqft:
-            must_have.append(f"at least {intent.min_sqft} sq ft")
-        if intent.garage_required:
-            must_have.append("with parking/garage")
-        if intent.property_type:
-            must_have.append(f"preferably a {intent.property_type}")
+        must_have = [template.format(value) for field, template in _MUST_HAVE_SPEC if (value := getattr(intent, field))]
         
         # Soft Preferences (Nice to Have)
-        if intent.good_schools:
-            nice_to_have.append("good schools nearby")
-        if intent.yard:
-            nice_to_have.append("with yard/garden")
-        if intent.family_friendly:
-            nice_to_have.append("family-friendly")
-        if intent.walk_to_metro:
-            nice_to_have.append("near public transit")
-        if intent.modern:
-            nice_to_have.append("modern/contemporary")
-        if intent.renovated:
-            nice_to_have.append("recently renovated")
-        if intent.ocean_view:
-            nice_to_have.append("ocean view")
-        if intent.mountain_view:
-            nice_to_have.append("mountain view")
-        if intent.quiet:
-            nice_to_have.append("quiet neighborhood")
-        if intent.featured:
-            nice_to_have.append("featured/premium")
-        if intent.near_grocery:
-            nice_to_have.append("near grocery stores")
-        if intent.near_shopping:
-            nice_to_have.append("near shopping")
-        if intent.safe_area:
-            nice_to_have.append("safe area")
-        if intent.walkable:
-            nice_to_have.append("walkable neighborhood")
-        if intent.dining_options:
-            nice_to_have.append("dining options nearby")
-        if intent.short_term_rental:
-            nice_to_have.append("short-term rental")
-        if intent.pet_friendly:
-            nice_to_have.append("pet-friendly")
+        nice_to_have = [label for field, label in _NICE_TO_HAVE_SPEC if getattr(intent, field)]
         
         # Generate the enhanced response
         if not must_have and not nice_to_have:
             return "No specific requirements specified"
         
-        result = "Here is what you are looking for:\n"
-        
+        sections = []
         if must_have:
-            result += "must have:\n"
-            for req in must_have:
-                result += f"• {req}\n"
-        
+            sections.append("must have:\n" + "\n".join(f"• {req}" for req in must_have))
         if nice_to_have:
-            if must_have:
-                result += "\n"
-            result += "nice to have:\n"
-            for req in nice_to_have:
-                result += f"• {req}\n"
+            sections.append("nice to have:\n" + "\n".join(f"• {req}" for req in nice_to_have))
         
-        return result.strip()
+        return "Here is what you are looking for:\n" + "\n\n".join(sections)
     
-    async def _perform_search(self, query: str, intent: SearchIntent, limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+    async def _perform_search(
+        self,
+        query: str,
+        intent: SearchIntent,
+        limit: int,
+        generate_reasons: bool = True,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
         """Perform the actual search. Returns (results, used_fallback)"""
+        if query_embedding is None:
+            try:
+                query_embedding = await self.get_embedding(query)
+            except Exception as e:
+                logger.error("Error in _perform_search: %s", e)
+                logger.error("Error type: %s", type(e).__name__)
+                logger.error("Error args: %s", e.args)
+                raise Exception(f"Search failed: {str(e)}")
+        
+        candidates, used_fallback = await self._fetch_candidates(intent, query_embedding)
+        results = await self._score_candidates(candidates, intent, limit, generate_reasons)
+        return results, used_fallback
+    
+    async def _fetch_candidates(
+        self,
+        intent: SearchIntent,
+        query_embedding: List[float]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Retrieve scoring candidates for an intent. Returns (candidates, used_fallback)
+        
+        Candidates are in vector search order and carry only the scoring columns.
+        """
+        # Step 1: Build filter conditions
         try:
-            # Step 1: Get query embedding
-            query_embedding = await self.get_embedding(query)
-            
-            # Step 2: Build filter conditions
             where_clause, params = self._build_filter_conditions(intent)
-            
-            # Step 3: Get candidates
-            candidates = await self._get_candidates(where_clause, params)
-        
         except Exception as e:
-            logger.error(f"Error in _perform_search: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error args: {e.args}")
+            logger.error("Error in _fetch_candidates: %s", e)
+            logger.error("Error type: %s", type(e).__name__)
+            logger.error("Error args: %s", e.args)
             raise Exception(f"Search failed: {str(e)}")
         
-        # Step 4: Smart Vector Search with Fallback
+        # Step 2-3: Filtered vector search in a single query, with fallback
         used_fallback = False
-        if candidates:
-            # Use filtered candidate pool (efficient)
-            candidate_ids = [c['id'] for c in candidates]
-            logger.info(f"Using structured filtering with {len(candidates)} candidates")
-            try:
-                vector_results = await self.db_manager.vector_search(query_embedding, candidate_ids, top_k=200)
-                logger.info(f"Vector search on filtered candidates returned {len(vector_results)} results")
-            except Exception as e:
-                logger.error(f"Error in vector search on filtered candidates: {e}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Error args: {e.args}")
-                raise Exception(f"Vector search failed: {str(e)}")
-        else:
+        try:
+            vector_results = await self.db_manager.vector_search(query_embedding, where_clause, params, top_k=200)
+            logger.info("Filtered vector search returned %d results", len(vector_results))
+        except Exception as e:
+            logger.error("Error in filtered vector search: %s", e)
+            logger.error("Error type: %s", type(e).__name__)
+            logger.error("Error args: %s", e.args)
+            raise Exception(f"Vector search failed: {str(e)}")
+        
+        if not vector_results:
             # Fallback: semantic search on entire database (comprehensive)
             used_fallback = True
-            logger.info("No candidates from structured filtering, falling back to full semantic search")
+            logger.info("No matches from structured filtering, falling back to full semantic search")
             try:
-                vector_results = await self.db_manager.vector_search(query_embedding, [], top_k=200)
-                logger.info(f"Full semantic search returned {len(vector_results)} results")
+                vector_results = await self.db_manager.full_vector_search(query_embedding, top_k=200)
+                logger.info("Full semantic search returned %d results", len(vector_results))
             except Exception as e:
-                logger.error(f"Error in full semantic search: {e}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Error args: {e.args}")
+                logger.error("Error in full semantic search: %s", e)
+                logger.error("Error type: %s", type(e).__name__)
+                logger.error("Error args: %s", e.args)
                 raise Exception(f"Full semantic search failed: {str(e)}")
         
-        # Step 5: Score and rank
-        scored_results = []
-        logger.info(f"Starting to score {len(vector_results)} listings")
-        
-        for i, listing in enumerate(vector_results):
-            try:
-                logger.debug(f"Scoring listing {i+1}/{len(vector_results)}: {listing.get('id', 'unknown')}")
-                score_details = self.scoring_engine.calculate_score_with_details(listing, intent)
-                listing['final_score'] = score_details['final_score']
-                listing['score_details'] = score_details
-                scored_results.append(listing)
-            except Exception as e:
-                logger.error(f"Error scoring listing {listing.get('id', 'unknown')}: {e}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Error args: {e.args}")
-                logger.error(f"Listing keys: {list(listing.keys()) if listing else 'None'}")
-                logger.error(f"Intent property_type: {getattr(intent, 'property_type', 'Not found')}")
-                # Skip this listing and continue
-                continue
-        
-        # Step 6: Sort and limit
-        scored_results.sort(key=lambda x: x['final_score'], reverse=True)
-        return scored_results[:limit], used_fallback
+        return vector_results, used_fallback
     
-    def _build_filter_conditions(self, intent: SearchIntent) -> Tuple[str, List[Any]]:
-        """Build SQL WHERE conditions"""
-        conditions = ["embedding IS NOT NULL"]
-        params = []
-        param_count = 1
-        
-        if intent.city:
-            conditions.append(f"LOWER(city) = ${param_count}")
-            params.append(intent.city.lower())
-            param_count += 1
-        
-        if intent.state:
-            conditions.append(f"LOWER(state) = ${param_count}")
-            params.append(intent.state.lower())
-            param_count += 1
-        
-        if intent.max_price_sale:
-            conditions.append(f"price_for_sale <= ${param_count}")
-            params.append(intent.max_price_sale)
-            param_count += 1
-        
-        if intent.max_price_rent:
-            conditions.append(f"price_per_month <= ${param_count}")
-            params.append(intent.max_price_rent)
-            param_count += 1
-        
-        if intent.min_beds:
-            conditions.append(f"bedrooms >= ${param_count}")
-            params.append(intent.min_beds)
-            param_count += 1
-        
-        if intent.min_baths:
-            conditions.append(f"bathrooms >= ${param_count}")
-            params.append(intent.min_baths)
-            param_count += 1
+    async def _score_candidates(
+        self,
+        candidates: List[Dict[str, Any]],
+        intent: SearchIntent,
+        limit: int,
+        generate_reasons: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Rank candidates against an intent and return the top `limit`, fully detailed
+        
+        Candidates can be rescored against other intents; they are not modified.
+        """
+        # Step 1: Drop malformed rows once up front, then score all listings in one vectorized pass
+        well_formed = [listing for listing in candidates if _is_well_formed(listing)]
+        if len(well_formed) != len(candidates):
+            logger.warning("Skipping %d malformed listings", len(candidates) - len(well_formed))
+        logger.info("Starting to score %d listings", len(well_formed))
+        scores = self.scoring_engine.calculate_scores_batch(well_formed, intent)
         
-        if intent.garage_required:
-            conditions.append("(garage_number > 0 OR has_parking_lot = true)")
+        # Step 2: Select the top results and build details only for them
+        top_results = [dict(well_formed[i]) for i in self._top_k_indices(scores, limit)]
         
-        if intent.property_type:
-            conditions.append(f"LOWER(property_type) = ${param_count}")
-            params.append(intent.property_type.lower())
-            param_count += 1
+        # Step 3: Hydrate display columns for the returned listings only
+        listing_details = await self.db_manager.get_listing_details([listing['id'] for listing in top_results])
         
-        where_clause = " AND ".join(conditions)
-        return where_clause, params
-    
-    async def _get_candidates(self, where_clause: str, params: List[Any]) -> List[Dict[str, Any]]:
-        """Get candidate listings from database"""
-        query = f"""
-        SELECT 
-            id, title, address, bedrooms, bathrooms, square_feet,
-            garage_number, has_parking_lot, property_type,
-            price_for_sale, price_per_month,
-            has_yard, school_rating, crime_index, facing,
-            shopping_idx, grocery_idx, tags, embedding_text,
-            city, state, country, neighborhood,
-            description, amenities, host_id, is_available, is_featured,
-            latitude, longitude, rating, review_count,
-            property_listing_type, year_built, year_renovated,
-            created_at, updated_at,
-            CASE 
-                WHEN property_listing_type = 'sale' THEN price_for_sale
-                WHEN property_listing_type = 'both' THEN price_per_month
-                WHEN property_listing_type = 'rent' THEN price_per_month
-                ELSE COALESCE(price_per_month, price_for_sale)
-            END as price,
-            images
-        FROM listings_v2 
-        WHERE {where_clause}
-        LIMIT 10000
-        """
+        scored_results = []
+        for listing in top_results:
+            listing.update(listing_details.get(listing['id'], {}))
+            score_details = self.scoring_engine.calculate_score_with_details(listing, intent)
+            listing['final_score'] = score_details['final_score']
+            listing['score_details'] = score_details
+            if generate_reasons:
+                listing['reason'] = _format_reason(score_details)
+            scored_results.append(listing)
         
-        return await self.db_manager.execute_query(query, *params)
+        return scored_results
     
-    async def _generate_reasons(self, query: str, results: List[Dict[str, Any]], intent: SearchIntent):
-        """Generate reasons for search results"""
-        try:
-            # Simple template-based reasons for now
-            for listing in results:
-                listing['reason'] = self._generate_simple_reason(listing, intent)
-        except Exception as e:
-            logger.warning(f"Reason generation failed: {e}")
+    @staticmethod
+    def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores, best first (ties keep vector search order)"""
+        if k <= 0 or len(scores) == 0:
+            return np.zeros(0, dtype=np.intp)
+        if k < len(scores):
+            # O(N) partial selection; only the k selected rows get sorted
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.lexsort((top, -scores[top]))]
     
-    def _generate_simple_reason(self, listing: Dict[str, Any], intent: SearchIntent) -> str:
-        """Generate a detailed reason for the match using score details"""
-        if 'score_details' not in listing:
-            # Fallback to simple reason if no score details available
-            reasons = []
-            
-            bedrooms = listing.get('bedrooms')
-            if intent.min_beds and bedrooms is not None and bedrooms >= intent.min_beds:
-                reasons.append(f"{bedrooms} bedrooms")
-            
-            price = listing.get('price_for_sale')
-            if intent.max_price_sale and price is not None and price <= intent.max_price_sale:
-                reasons.append(f"under ${intent.max_price_sale:,.0f}")
-            
-            city = listing.get('city')
-            if intent.city and city and city.lower() == intent.city.lower():
-                reasons.append(f"in {intent.city}")
-            
-            if reasons:
-                return f"Matches your search: {', '.join(reasons)}"
-            else:
-                return "Recommended based on semantic similarity"
-        
-        # Use detailed score information
-        score_details = listing['score_details']
-        matches = score_details['matches']
-        
-        reason_parts = []
-        
-        # Structured matches
-        if matches['structured']:
-            reason_parts.append("Matches your requirements: " + ", ".join(matches['structured']))
-        
-        # Semantic matches
-        if matches['semantic']:
-            reason_parts.append("Semantic matches: " + ", ".join(matches['semantic']))
-        
-        # Soft preferences
-        if matches['soft_preferences']:
-            reason_parts.append("Bonus features: " + ", ".join(matches['soft_preferences']))
+    def _build_filter_conditions(self, intent: SearchIntent) -> Tuple[str, List[Any]]:
+        """Build SQL WHERE conditions
         
-        # Missing requirements (show if there are any, but limit to 2)
-        if matches['missing']:
-            reason_parts.append("Note: " + ", ".join(matches['missing'][:2]))  # Limit to 2 missing items
+        The clause text depends only on which filters are present, so it is built
+        once per shape and reused; asyncpg then reuses the prepared statement too.
+        """
+        mask = 0
+        params = []
+        for bit, (field, _, to_param) in enumerate(_FILTER_FIELDS):
+            value = getattr(intent, field)
+            if value:
+                mask |= 1 << bit
+                if to_param is not None:
+                    params.append(to_param(value))
+        
+        where_clause = self._stmt_cache.get(mask)
+        if where_clause is None:
+            conditions = ["embedding IS NOT NULL"]
+            param_count = 1
+            for bit, (_, condition, to_param) in enumerate(_FILTER_FIELDS):
+                if mask & (1 << bit):
+                    if to_param is not None:
+                        condition = condition.format(param_count)
+                        param_count += 1
+                    conditions.append(condition)
+            where_clause = " AND ".join(conditions)
+            self._stmt_cache[mask] = where_clause
         
-        if reason_parts:
-            return " | ".join(reason_parts)
-        else:
-            return "Recommended based on semantic similarity"
+        return where_clause, params
     
     def _convert_to_listing_results(self, results: List[Dict[str, Any]]) -> List[ListingResult]:
         """Convert search results to ListingResult objects"""
         items = []
         for listing in results:
-            # Handle data type conversions
-            images_data = listing.get("images")
-            if isinstance(images_data, str):
-                try:
-                    images_data = json.loads(images_data)
-                except:
-                    images_data = []
-            elif not isinstance(images_data, list):
-                images_data = []
+            fields_data = dict(zip(_LISTING_FIELDS, map(listing.get, _LISTING_FIELDS)))
             
             # Get score details if available
             score_details = listing.get("score_details", {})
@@ -436,38 +468,21 @@ class SearchEngine:
                 }
                 match_details = score_details.get("matches", {})
             
+            host_id = listing.get("host_id")
+            created_at = listing.get("created_at")
+            updated_at = listing.get("updated_at")
+            
             item = ListingResult(
                 id=str(listing["id"]),
-                title=listing.get("title"),
-                address=listing.get("address"),
-                bedrooms=listing.get("bedrooms"),
-                bathrooms=listing.get("bathrooms"),
-                square_feet=listing.get("square_feet"),
-                garage_number=listing.get("garage_number"),
-                price=listing.get("price"),
-                images=images_data,
-                city=listing.get("city"),
-                state=listing.get("state"),
-                country=listing.get("country"),
-                neighborhood=listing.get("neighborhood"),
-                description=listing.get("description"),
-                amenities=listing.get("amenities"),
-                host_id=str(listing.get("host_id")) if listing.get("host_id") else None,
-                is_available=listing.get("is_available"),
-                is_featured=listing.get("is_featured"),
-                latitude=listing.get("latitude"),
-                longitude=listing.get("longitude"),
-                rating=listing.get("rating"),
-                review_count=listing.get("review_count"),
-                property_listing_type=listing.get("property_listing_type"),
-                year_built=listing.get("year_built"),
-                year_renovated=listing.get("year_renovated"),
-                created_at=str(listing.get("created_at")) if listing.get("created_at") else None,
-                updated_at=str(listing.get("updated_at")) if listing.get("updated_at") else None,
+                images=_parse_images(listing.get("images")),
+                host_id=str(host_id) if host_id else None,
+                created_at=str(created_at) if created_at else None,
+                updated_at=str(updated_at) if updated_at else None,
                 similarity_score=listing.get("final_score", 0.0),
                 reason=listing.get("reason", ""),
                 score_breakdown=score_breakdown,
-                match_details=match_details
+                match_details=match_details,
+                **fields_data
             )
             items.append(item)
         